@@ -0,0 +1,87 @@
+"""Measure how long importing phac_aspc modules takes in a fresh interpreter
+
+Each module is imported in its own interpreter, run with `python -X importtime`, and
+the cumulative import time Python reports for it is collected. Run from the
+repository root:
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --runs 21 phac_aspc.django.excel
+
+Modules are imported after django.setup() by default, like they would be in a
+running project. With --before-setup they're imported before it, like settings
+modules and other code running before the app registry is ready.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+DEFAULT_MODULES_AFTER_SETUP = [
+    "phac_aspc.django.excel",
+    "phac_aspc.django.helpers.auth.views",
+    "phac_aspc.django.helpers.urls",
+]
+DEFAULT_MODULES_BEFORE_SETUP = [
+    "phac_aspc.django.helpers.templatetags",
+    "phac_aspc.jinja.standard_helpers",
+]
+
+
+def get_import_time(module, before_setup):
+    """Returns the cumulative import time of `module`, in milliseconds"""
+    setup = "" if before_setup else "django.setup(set_prefix=False); "
+    process = subprocess.run(
+        [
+            sys.executable,
+            "-X",
+            "importtime",
+            "-c",
+            f"import django; {setup}import {module}",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+        env={
+            "DJANGO_SETTINGS_MODULE": "testapp.settings",
+            **os.environ,
+        },
+    )
+
+    # lines look like "import time:  self [us] | cumulative | imported package"
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line.split("|")
+        if name.strip() == module:
+            return int(cumulative) / 1000
+
+    raise RuntimeError(f"{module} was already imported before the benchmark")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("modules", nargs="*")
+    parser.add_argument("--runs", type=int, default=11)
+    parser.add_argument("--before-setup", action="store_true")
+    args = parser.parse_args()
+
+    modules = args.modules or (
+        DEFAULT_MODULES_BEFORE_SETUP
+        if args.before_setup
+        else DEFAULT_MODULES_AFTER_SETUP
+    )
+    for module in modules:
+        times = [
+            get_import_time(module, args.before_setup)
+            for _ in range(args.runs)
+        ]
+        print(
+            f"{module:<40} median {statistics.median(times):7.1f} ms, "
+            f"min {min(times):7.1f} ms ({args.runs} runs)"
+        )
+
+
+if __name__ == "__main__":
+    main()
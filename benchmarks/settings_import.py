@@ -0,0 +1,98 @@
+"""Measure how long importing phac_aspc.django.settings takes in a fresh interpreter
+
+Importing the settings reads the project's env vars and .env file (the nearest one
+to the settings module, see get_env), so this is time added to the startup of every
+process. Run from the repository root:
+
+    python benchmarks/settings_import.py
+    python benchmarks/settings_import.py --runs 81 --settings myproject.settings
+
+Wall-clock times are taken without profiling. The time spent in the functions
+listed by --profile is then measured in separate runs, with cProfile. Functions are
+matched by name, in any module, e.g. `stack` for inspect.stack(), which the settings
+utils used to call to find the calling module.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+DEFAULT_PROFILED_FUNCTIONS = ["get_env", "warn_and_remove", "stack"]
+
+IMPORT_SETTINGS = """
+import json, time
+start = time.perf_counter()
+import phac_aspc.django.settings
+print(json.dumps((time.perf_counter() - start) * 1000))
+"""
+
+PROFILE_SETTINGS_IMPORT = """
+import cProfile, json, pstats, sys
+profiler = cProfile.Profile()
+profiler.enable()
+import phac_aspc.django.settings
+profiler.disable()
+times = dict.fromkeys(sys.argv[1:], 0)
+calls = dict.fromkeys(sys.argv[1:], 0)
+for (_, _, name), (_, count, _, cumulative, _) in pstats.Stats(
+    profiler
+).stats.items():
+    if name in times:
+        times[name] += cumulative * 1000
+        calls[name] += count
+print(json.dumps({"times": times, "calls": calls}))
+"""
+
+
+def run_python(code, settings, *args):
+    process = subprocess.run(
+        [sys.executable, "-c", code, *args],
+        capture_output=True,
+        text=True,
+        check=True,
+        env={**os.environ, "DJANGO_SETTINGS_MODULE": settings},
+    )
+    return json.loads(process.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=21)
+    parser.add_argument("--settings", default="testapp.settings")
+    parser.add_argument(
+        "--profile",
+        action="append",
+        metavar="FUNCTION",
+        help=f"defaults to {', '.join(DEFAULT_PROFILED_FUNCTIONS)}",
+    )
+    args = parser.parse_args()
+
+    times = [
+        run_python(IMPORT_SETTINGS, args.settings) for _ in range(args.runs)
+    ]
+    print(
+        f"{'import phac_aspc.django.settings':<40} "
+        f"median {statistics.median(times):7.1f} ms, "
+        f"min {min(times):7.1f} ms ({args.runs} runs)"
+    )
+
+    functions = args.profile or DEFAULT_PROFILED_FUNCTIONS
+    profiles = [
+        run_python(PROFILE_SETTINGS_IMPORT, args.settings, *functions)
+        for _ in range(args.runs)
+    ]
+    for function in functions:
+        function_times = [profile["times"][function] for profile in profiles]
+        print(
+            f"{function + '()':<40} "
+            f"median {statistics.median(function_times):7.1f} ms, "
+            f"min {min(function_times):7.1f} ms "
+            f"({profiles[0]['calls'][function]} calls, profiled)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,7 @@ utilities for writing excel data using openpyxl
 
 import csv
 import re
+from functools import lru_cache
 
 from django.core.paginator import Paginator
 from django.db.models import QuerySet
@@ -13,17 +14,41 @@ from django.utils.functional import Promise
 from django.utils.safestring import SafeString
 from django.views import View
 
-from openpyxl.cell import WriteOnlyCell
-from openpyxl.utils import get_column_letter
+# openpyxl is only imported on first use, by _load_openpyxl, so processes that never
+# export don't pay for it. These module globals are set when it is
+OPENPYXL_GLOBALS = [
+    "openpyxl",
+    "WriteOnlyCell",
+    "get_column_letter",
+    "ILLEGAL_CHARACTERS_RE",
+    "escapeSvc",
+]
+
+
+@lru_cache(maxsize=None)
+def _load_openpyxl():
+    # pylint: disable=global-statement,import-outside-toplevel,invalid-name
+    global openpyxl, WriteOnlyCell, get_column_letter
+    global ILLEGAL_CHARACTERS_RE, escapeSvc
+
+    try:
+        import openpyxl
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+        from openpyxl.utils import escape as escapeSvc
+        from openpyxl.utils import get_column_letter
+    except (ImportError, ModuleNotFoundError) as exc:
+        raise ImportError(
+            "must install openpyxl==3.0.10 to use excel helpers"
+        ) from exc
+
+
+def __getattr__(name):
+    if name in OPENPYXL_GLOBALS:
+        _load_openpyxl()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-try:
-    import openpyxl
-    from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
-    from openpyxl.utils import escape as escapeSvc
-except (ImportError, ModuleNotFoundError) as exc:
-    raise ImportError(
-        "must install openpyxl==3.0.10 to use excel helpers"
-    ) from exc
 
 # Note that OPENPXYL starts columns and rows at index 1.
 
@@ -36,6 +61,7 @@ def escape_for_xlsx(text):
     escape a string for excel
     """
     # pylint: disable=unidiomatic-typecheck
+    _load_openpyxl()
     return escapeSvc.escape(text) if isinstance(text, str) else text
 
 
@@ -357,6 +383,7 @@ class AbstractSheetWriter(AbstractWriter):
         return [col.get_column_width() for col in self.get_column_configs()]
 
     def write(self):
+        _load_openpyxl()
         worksheet = self.workbook.create_sheet(title=self.get_sheet_name())
 
         for col_index, column_width in enumerate(self.get_column_widths()):
@@ -418,6 +445,7 @@ def serialize_value(value):
             write_val = value
 
     xl_val = escape_for_xlsx(write_val)
+    # escape_for_xlsx has loaded openpyxl
     if next(ILLEGAL_CHARACTERS_RE.finditer(str(value)), None):
         xl_val = re.sub(ILLEGAL_CHARACTERS_RE, "", str(xl_val))
 
@@ -479,6 +507,7 @@ class AbstractExportView(BaseAbstractExportView):
     filename = "export.xlsx"
 
     def get(self, request, *args, **kwargs):
+        _load_openpyxl()
         wb = openpyxl.Workbook(write_only=True)
         WriterCls = self.get_sheetwriter_class()
 
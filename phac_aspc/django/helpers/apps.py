@@ -3,6 +3,7 @@ Django application entrypoint
 """
 
 from django.apps import AppConfig
+from django.conf import settings
 
 from phac_aspc.django.helpers.ready import process_ready_hooks
 
@@ -19,3 +20,23 @@ class HelpersConfig(AppConfig):
 
     def ready(self):
         process_ready_hooks()
+
+        # pylint: disable=import-outside-toplevel,unused-import
+        # connects the signal receivers invalidating cached users
+        from phac_aspc.django.helpers.auth import user_cache  # noqa: F401
+        from phac_aspc.django.helpers.locale.code import get_language_table
+        from phac_aspc.django.helpers.templatetags.phac_aspc_inline_svg import (
+            KNOWN_SVG_PATHS,
+            precompile_inline_svgs,
+            warm_inline_svg_cache,
+        )
+
+        if not settings.DEBUG:
+            # precompiling every static SVG is opt-in, as every process (including
+            # management commands and task workers) parses them at startup
+            if getattr(settings, "PHAC_ASPC_INLINE_SVG_PRECOMPILE_ALL", False):
+                precompile_inline_svgs()
+            else:
+                precompile_inline_svgs(KNOWN_SVG_PATHS)
+        warm_inline_svg_cache()
+        get_language_table()
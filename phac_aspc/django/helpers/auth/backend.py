@@ -9,15 +9,58 @@ from django.contrib.auth.base_user import (  # pylint: disable=unused-import
 )
 from django.http.request import HttpRequest
 
+from phac_aspc.django.helpers.auth.user_cache import (
+    get_cached_user,
+    is_user_cache_enabled,
+)
+
 
 class PhacAspcOAuthBackend(BaseBackend):
-    """Authentication backend that creates a user using only the oid and email"""
+    """Authentication backend that creates a user using only the oid and email
+
+    Other claims can be synced by subclassing and extending `claim_fields`, a mapping
+    of claim names to the (concrete) user model fields they're stored in, e.g.
+    `{"email": "email", "name": "first_name"}`.
+
+    Setting `group_claim` to the name of a claim listing group names, e.g. "roles",
+    also syncs the user's groups: on each login, the user is put in exactly the
+    existing groups named by the claim.
+    """
+
+    claim_fields = {"email": "email"}
+    group_claim = None
+
+    def _get_claim_values(self, user_info):
+        # missing or empty claims never overwrite what's already stored
+        return {
+            field: user_info[claim]
+            for claim, field in self.claim_fields.items()
+            if user_info.get(claim) not in (None, "")
+        }
 
     def _sync_user(self, user, user_info, force=False):
-        email = user_info["email"] if "email" in user_info else ""
-        if force or (email not in ("", user.email)):
-            user.email = email
-            user.save()
+        """Saves the claims of `user_info` that changed to `user`. `force` is set
+        for users that were just created, from those claims"""
+        claim_values = self._get_claim_values(user_info)
+        changed_fields = [
+            field
+            for field, value in claim_values.items()
+            if getattr(user, field) != value
+        ]
+        if changed_fields:
+            for field in changed_fields:
+                setattr(user, field, claim_values[field])
+            user.save(update_fields=changed_fields)
+
+        if self.group_claim is not None:
+            self._sync_groups(user, user_info)
+
+    def _sync_groups(self, user, user_info):
+        group_names = user_info.get(self.group_claim)
+        if group_names is None:
+            return
+        # set() only writes the groups added or removed
+        user.groups.set(user.groups.model.objects.filter(name__in=group_names))
 
     def authenticate(
         self,
@@ -26,17 +69,22 @@ class PhacAspcOAuthBackend(BaseBackend):
         **kwargs: Any,
     ) -> "AbstractBaseUser | None":
         if user_info is not None:
-            user_model = get_user_model()
-            try:
-                user = user_model.objects.get(username=user_info["oid"])
-                self._sync_user(user, user_info)
-            except user_model.DoesNotExist:
-                user = user_model(username=user_info["oid"])
-                self._sync_user(user, user_info, True)
+            # get_or_create recovers from the IntegrityError raised when concurrent
+            # first logins race to create the same user
+            user, created = get_user_model().objects.get_or_create(
+                username=user_info["oid"],
+                defaults=self._get_claim_values(user_info),
+            )
+            self._sync_user(user, user_info, created)
             return user
         return None
 
     def get_user(self, user_id):
+        if is_user_cache_enabled():
+            return get_cached_user(user_id, self._load_user)
+        return self._load_user(user_id)
+
+    def _load_user(self, user_id):
         user_model = get_user_model()
         try:
             return user_model.objects.get(pk=user_id)
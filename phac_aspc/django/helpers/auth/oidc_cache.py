@@ -0,0 +1,240 @@
+"""Shared, TTL based cache of OpenID Connect discovery metadata and signing keys"""
+
+import hashlib
+import logging
+import threading
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+import requests
+from authlib.integrations.django_client import DjangoOAuth2App, OAuth
+
+logger = logging.getLogger(__name__)
+
+SHARED_CACHE_KEY_PREFIX = "phac_aspc_oidc"
+
+OIDC_CACHE_SETTINGS = [
+    "OIDC_CACHE_TTL",
+    "OIDC_CACHE_REFRESH_MARGIN",
+    "OIDC_CACHE_REFETCH_INTERVAL",
+    "OIDC_CACHE_ALIAS",
+]
+
+
+class OIDCDocumentCache:
+    """
+    Caches the JSON documents published by an identity provider (discovery metadata,
+    JWKS), by URL, for `ttl` seconds.
+
+    Documents are kept in process and, when `cache_alias` is set, in the matching
+    Django cache, so workers share what any one of them fetched. Within
+    `refresh_margin` seconds of expiry, cached documents are still served while a
+    background thread fetches a replacement. Concurrent misses on the same URL wait
+    on a single fetch.
+
+    `refetch` is for signing key misses (i.e. a token signed with an unknown kid,
+    after a key rotation). It forces a fetch, unless the document was fetched in the
+    last `refetch_interval` seconds, so a burst of logins following a rotation (or a
+    stream of tokens with bogus kids) costs the identity provider at most one request
+    per interval.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        ttl: float = 3600,
+        refresh_margin: float = 300,
+        refetch_interval: float = 30,
+        cache_alias: str = None,
+        timeout: float = 5.0,
+        clock=time.time,
+    ):
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+        self.refetch_interval = refetch_interval
+        self.cache_alias = cache_alias
+        self.timeout = timeout
+        self.clock = clock
+
+        # (document, fetched at) pairs by URL
+        self._entries = {}
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+        self._refreshing = set()
+        self._session = requests.Session()
+
+    def get(self, url):
+        """Returns the document at `url`, from cache when fresh"""
+        entry = self._entries.get(url)
+
+        if entry is None or self._age(entry) >= self.ttl:
+            entry = self._load(url)
+        elif self._age(entry) >= self.ttl - self.refresh_margin:
+            self._refresh_in_background(url)
+
+        return entry[0]
+
+    def refetch(self, url):
+        """Returns a freshly fetched document at `url`, see the class docstring"""
+        with self._lock_for(url):
+            entry = self._newest_entry(url)
+            if entry is None or self._age(entry) >= self.refetch_interval:
+                entry = self._fetch(url)
+            else:
+                self._entries[url] = entry
+
+        return entry[0]
+
+    def clear(self):
+        """Empties the in-process cache. The shared cache is left as is"""
+        self._entries.clear()
+
+    def _age(self, entry):
+        return self.clock() - entry[1]
+
+    def _lock_for(self, url):
+        with self._locks_lock:
+            return self._locks.setdefault(url, threading.Lock())
+
+    def _load(self, url):
+        with self._lock_for(url):
+            # another thread may have loaded it while this one waited on the lock
+            entry = self._newest_entry(url)
+            if entry is not None and self._age(entry) < self.ttl:
+                self._entries[url] = entry
+                return entry
+
+            return self._fetch(url)
+
+    def _newest_entry(self, url):
+        entries = [
+            entry
+            for entry in [self._entries.get(url), self._get_shared(url)]
+            if entry is not None
+        ]
+        return max(entries, key=lambda entry: entry[1], default=None)
+
+    def _fetch(self, url):
+        response = self._session.get(url, timeout=self.timeout)
+        response.raise_for_status()
+
+        entry = (response.json(), self.clock())
+        self._entries[url] = entry
+        self._set_shared(url, entry)
+        return entry
+
+    def _refresh_in_background(self, url):
+        with self._locks_lock:
+            if url in self._refreshing:
+                return
+            self._refreshing.add(url)
+
+        threading.Thread(
+            target=self._refresh,
+            args=(url,),
+            name=f"{self.__class__.__name__} refresh",
+            daemon=True,
+        ).start()
+
+    def _refresh(self, url):
+        try:
+            with self._lock_for(url):
+                entry = self._newest_entry(url)
+                if (
+                    entry is not None
+                    and self._age(entry) < self.ttl - self.refresh_margin
+                ):
+                    # another worker already refreshed it
+                    self._entries[url] = entry
+                else:
+                    self._fetch(url)
+        except requests.RequestException as exception:
+            # the cached document is still served until it expires
+            logger.warning(
+                'Background refresh of "%s" failed', url, exc_info=exception
+            )
+        finally:
+            with self._locks_lock:
+                self._refreshing.discard(url)
+
+    def _get_shared_cache(self):
+        if not self.cache_alias:
+            return None
+
+        # Modules that read global state are best deffered to call time rather than
+        # module-load
+        # pylint: disable=import-outside-toplevel
+        from django.core.cache import caches
+
+        return caches[self.cache_alias]
+
+    def _shared_key(self, url):
+        return (
+            f"{SHARED_CACHE_KEY_PREFIX}:"
+            + hashlib.sha256(url.encode("utf-8")).hexdigest()
+        )
+
+    def _get_shared(self, url):
+        shared_cache = self._get_shared_cache()
+        if shared_cache is None:
+            return None
+        entry = shared_cache.get(self._shared_key(url))
+        return tuple(entry) if entry is not None else None
+
+    def _set_shared(self, url, entry):
+        shared_cache = self._get_shared_cache()
+        if shared_cache is not None:
+            shared_cache.set(self._shared_key(url), entry, timeout=self.ttl)
+
+
+@lru_cache(maxsize=None)
+def get_oidc_cache():
+    """Returns the process wide OIDCDocumentCache, configured from settings"""
+    return OIDCDocumentCache(
+        ttl=getattr(settings, "OIDC_CACHE_TTL", 3600),
+        refresh_margin=getattr(settings, "OIDC_CACHE_REFRESH_MARGIN", 300),
+        refetch_interval=getattr(settings, "OIDC_CACHE_REFETCH_INTERVAL", 30),
+        cache_alias=getattr(settings, "OIDC_CACHE_ALIAS", None),
+    )
+
+
+@receiver(setting_changed)
+def clear_oidc_cache(*, setting=None, **kwargs):
+    if setting is None or setting in OIDC_CACHE_SETTINGS:
+        get_oidc_cache.cache_clear()
+
+
+class CachedMetadataOAuth2App(DjangoOAuth2App):
+    """
+    authlib's Django OAuth 2 client, with discovery metadata and signing keys read
+    through the shared OIDCDocumentCache rather than fetched once per client, and
+    never refreshed short of a signing key miss
+    """
+
+    def load_server_metadata(self):
+        if not self._server_metadata_url:
+            return super().load_server_metadata()
+
+        return {
+            **self.server_metadata,
+            **get_oidc_cache().get(self._server_metadata_url),
+        }
+
+    def fetch_jwk_set(self, force=False):
+        jwks_uri = self.load_server_metadata().get("jwks_uri")
+        if not jwks_uri or "jwks" in self.server_metadata:
+            # keys configured statically, rather than discovered
+            return super().fetch_jwk_set(force=force)
+
+        oidc_cache = get_oidc_cache()
+        return (
+            oidc_cache.refetch(jwks_uri) if force else oidc_cache.get(jwks_uri)
+        )
+
+
+class CachedMetadataOAuth(OAuth):
+    oauth2_client_cls = CachedMetadataOAuth2App
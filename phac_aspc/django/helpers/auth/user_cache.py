@@ -0,0 +1,148 @@
+"""Optional cache of the users loaded by PhacAspcOAuthBackend.get_user"""
+
+import uuid
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import FieldDoesNotExist
+from django.core.signals import setting_changed
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from phac_aspc.django.settings.security_env import (
+    OAUTH_ENV_PREFIX,
+    get_oauth_env_value,
+)
+
+USER_CACHE_KEY_PREFIX = "phac_aspc_user"
+
+# many-to-many fields of the user model whose changes invalidate cached users
+USER_M2M_FIELDS = ("groups", "user_permissions")
+
+# set on a group (or permission) between the pre_clear and post_clear of its users
+_CLEARED_USER_PKS_ATTRIBUTE = "_phac_aspc_cleared_user_pks"
+
+
+def is_user_cache_enabled():
+    return get_oauth_env_value("USER_CACHE")
+
+
+@lru_cache(maxsize=None)
+def get_user_cache():
+    """Returns the cache configured by `PHAC_ASPC_OAUTH_USER_CACHE_ALIAS`, or a
+    local-memory cache private to this module when no alias is set"""
+    alias = get_oauth_env_value("USER_CACHE_ALIAS")
+    if alias:
+        return caches[alias]
+
+    return LocMemCache(
+        USER_CACHE_KEY_PREFIX,
+        {"TIMEOUT": get_oauth_env_value("USER_CACHE_TIMEOUT")},
+    )
+
+
+def _version_key(pk):
+    return f"{USER_CACHE_KEY_PREFIX}:{pk}:version"
+
+
+def get_cached_user(pk, load_user):
+    """Returns the user with the given pk, calling `load_user(pk)` on cache misses.
+
+    Cached users are keyed by pk and a version stamp. Invalidating a user replaces
+    its stamp, so a copy loaded before the invalidation but cached after it is
+    never served.
+    """
+    user_cache = get_user_cache()
+    version = user_cache.get_or_set(
+        _version_key(pk), lambda: uuid.uuid4().hex, timeout=None
+    )
+    user_key = f"{USER_CACHE_KEY_PREFIX}:{pk}:{version}"
+
+    user = user_cache.get(user_key)
+    if user is None:
+        user = load_user(pk)
+        if user is not None:
+            user_cache.set(
+                user_key,
+                user,
+                timeout=get_oauth_env_value("USER_CACHE_TIMEOUT"),
+            )
+    return user
+
+
+def invalidate_cached_user(pk):
+    get_user_cache().set(_version_key(pk), uuid.uuid4().hex, timeout=None)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def invalidate_cached_user_on_change(*, instance=None, **kwargs):
+    if is_user_cache_enabled():
+        invalidate_cached_user(instance.pk)
+
+
+def _get_user_m2m_field_name(through):
+    # pylint: disable=protected-access
+    user_model = get_user_model()
+    for name in USER_M2M_FIELDS:
+        try:
+            field = user_model._meta.get_field(name)
+        except FieldDoesNotExist:
+            # e.g. a custom user model without PermissionsMixin
+            continue
+        if field.remote_field.through is through:
+            return name
+    return None
+
+
+@receiver(m2m_changed)
+def invalidate_cached_users_on_m2m_change(
+    *,
+    sender=None,
+    instance=None,
+    action=None,
+    reverse=False,
+    pk_set=None,
+    **kwargs,
+):
+    if not is_user_cache_enabled() or action not in (
+        "post_add",
+        "post_remove",
+        "pre_clear",
+        "post_clear",
+    ):
+        return
+
+    field_name = _get_user_m2m_field_name(sender)
+    if field_name is None:
+        return
+
+    if not reverse:
+        # e.g. user.groups.add(group)
+        if action != "pre_clear":
+            invalidate_cached_user(instance.pk)
+    elif action == "pre_clear":
+        # e.g. group.user_set.clear(), the users are only known before the clear
+        setattr(
+            instance,
+            _CLEARED_USER_PKS_ATTRIBUTE,
+            list(
+                get_user_model()
+                ._default_manager.filter(**{field_name: instance})
+                .values_list("pk", flat=True)
+            ),
+        )
+    else:
+        if action == "post_clear":
+            pk_set = instance.__dict__.pop(_CLEARED_USER_PKS_ATTRIBUTE, ())
+        for pk in pk_set:
+            invalidate_cached_user(pk)
+
+
+@receiver(setting_changed)
+def clear_user_cache(*, setting=None, **kwargs):
+    if setting is None or setting.startswith(f"{OAUTH_ENV_PREFIX}USER_CACHE"):
+        get_user_cache.cache_clear()
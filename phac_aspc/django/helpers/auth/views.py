@@ -1,5 +1,6 @@
 """OAuth authentication related views"""
 
+from functools import lru_cache
 from urllib import parse
 
 from django.contrib.auth import authenticate
@@ -9,18 +10,31 @@ from django.http import HttpResponseRedirect
 from django.shortcuts import render
 from django.urls import reverse
 
-from authlib.integrations.django_client import OAuth, OAuthError
-
 from phac_aspc.django.settings.security_env import get_oauth_env_value
 
-oauth = OAuth()
-
 PROVIDER = get_oauth_env_value("PROVIDER")
 BACKEND = get_oauth_env_value("USE_BACKEND")
 REDIRECT_LOGIN = get_oauth_env_value("REDIRECT_ON_LOGIN")
 
-if PROVIDER:
-    oauth.register(PROVIDER)
+
+@lru_cache(maxsize=None)
+def get_oauth():
+    """Returns the OAuth registry, with the provider registered. authlib (and the
+    HTTP and crypto libraries it pulls in) is only imported on first use, so
+    processes that never handle a login don't pay for it"""
+    # pylint: disable=import-outside-toplevel
+    from phac_aspc.django.helpers.auth.oidc_cache import CachedMetadataOAuth
+
+    oauth = CachedMetadataOAuth()
+    if PROVIDER:
+        oauth.register(PROVIDER)
+    return oauth
+
+
+def __getattr__(name):
+    if name == "oauth":
+        return get_oauth()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def validate_iss(claims, value):
@@ -34,7 +48,7 @@ def validate_iss(claims, value):
 def login(request):
     """Redirect users to the provider's login page"""
     if PROVIDER:
-        client = oauth.create_client(PROVIDER)
+        client = get_oauth().create_client(PROVIDER)
         auth_url_extra_params = {"state": request.build_absolute_uri()}
         return client.authorize_redirect(
             request,
@@ -47,8 +61,11 @@ def login(request):
 def authorize(request):
     """Verify the token received and perform authentication"""
     if PROVIDER:
+        # pylint: disable=import-outside-toplevel
+        from authlib.integrations.django_client import OAuthError
+
         try:
-            client = oauth.create_client(PROVIDER)
+            client = get_oauth().create_client(PROVIDER)
             token = client.authorize_access_token(
                 request,
                 claims_options={
@@ -1,21 +1,30 @@
+from functools import lru_cache
+
 from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.template import engines
+from django.utils.module_loading import import_string
+
+DTL_BACKEND = "django.template.backends.django.DjangoTemplates"
+JINJA_BACKEND = "django.template.backends.jinja2.Jinja2"
 
+# template objects by (backend, template name), only used outside of DEBUG
+_template_cache = {}
 
+
+@lru_cache(maxsize=None)
 def assert_both_dtl_and_jinja_configured():
-    are_both_dtl_and_jinja_configured = map(
-        lambda template_backend: next(
-            filter(
-                lambda template_config: template_config["BACKEND"]
-                == template_backend,
-                settings.TEMPLATES,
-            ),
-            False,
-        ),
-        [
-            "django.template.backends.django.DjangoTemplates",
-            "django.template.backends.jinja2.Jinja2",
-        ],
+    """
+    Verifies, once, that settings.TEMPLATES includes both the DTL and Jinja2 backends
+    """
+    are_both_dtl_and_jinja_configured = all(
+        any(
+            template_config["BACKEND"] == template_backend
+            for template_config in settings.TEMPLATES
+        )
+        for template_backend in [DTL_BACKEND, JINJA_BACKEND]
     )
 
     if not are_both_dtl_and_jinja_configured:
@@ -24,3 +33,39 @@ def assert_both_dtl_and_jinja_configured():
         )
 
     return are_both_dtl_and_jinja_configured
+
+
+@lru_cache(maxsize=None)
+def get_engine(backend):
+    """
+    Returns the first configured template engine of the given backend
+    """
+    backend_class = import_string(backend)
+
+    return next(
+        engine for engine in engines.all() if isinstance(engine, backend_class)
+    )
+
+
+def get_engine_template(backend, template_name):
+    """
+    Like django's get_template, but only looks in the first engine of the given
+    backend. Outside of DEBUG, template objects are cached
+    """
+    if settings.DEBUG:
+        return get_engine(backend).get_template(template_name)
+
+    try:
+        return _template_cache[(backend, template_name)]
+    except KeyError:
+        template = get_engine(backend).get_template(template_name)
+        _template_cache[(backend, template_name)] = template
+        return template
+
+
+@receiver(setting_changed)
+def clear_template_caches(*, setting=None, **kwargs):
+    if setting in (None, "TEMPLATES", "DEBUG"):
+        assert_both_dtl_and_jinja_configured.cache_clear()
+        get_engine.cache_clear()
+        _template_cache.clear()
@@ -1,9 +1,13 @@
-from django.template.loader import get_template
+from collections import ChainMap
+
+from django.template import Context
 
 from jinja2 import pass_context
 
 from phac_aspc.django.helpers.jinja_dtl_interop_utils import (
+    DTL_BACKEND,
     assert_both_dtl_and_jinja_configured,
+    get_engine_template,
 )
 
 
@@ -14,6 +18,15 @@ def include_from_dtl(context, template_name):
     """
     assert_both_dtl_and_jinja_configured()
 
-    dtl_template = get_template(template_name)
+    dtl_template = get_engine_template(DTL_BACKEND, template_name)
 
-    return dtl_template.render(context.get_all())
+    # a layered view of the Jinja2 context, rather than a copy of it. The empty top
+    # layer takes the DTL template's top level assignments (e.g. `{% url ... as x %}`),
+    # and the DTL context pushes its own layers on top, so the Jinja2 context isn't
+    # modified
+    return dtl_template.template.render(
+        Context(
+            ChainMap({}, context.vars, context.parent),
+            autoescape=dtl_template.backend.engine.autoescape,
+        )
+    )
@@ -1,15 +1,99 @@
 """Utility to get language code from lang strings with locales"""
 
+from functools import lru_cache
+from types import MappingProxyType
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
 from django.utils.translation import get_language, get_language_info
 
+# Canada's official languages, switched between when LANGUAGES doesn't list
+# exactly two languages (e.g. Django's default LANGUAGES)
+DEFAULT_LANGUAGE_PAIR = ("en-ca", "fr-ca")
+
+
+class LanguageEntry(NamedTuple):
+    code: str
+    # the language code without its locale, e.g. "fr" for fr-ca
+    short_code: str
+    other_code: str
+    # the other language's name in that language, e.g. "Français"
+    other_label: str
+
+
+def _get_language_info(code):
+    try:
+        return get_language_info(code)
+    except KeyError:
+        # unknown to Django, assume the generic language is the part before the
+        # locale and the code is the best name we have
+        return {"code": code.split("-")[0], "name_local": code}
+
+
+def _get_language_pair():
+    codes_by_short_code = {}
+    for code, _ in settings.LANGUAGES:
+        code = code.lower()
+        codes_by_short_code.setdefault(_get_language_info(code)["code"], code)
+
+    if len(codes_by_short_code) == 2:
+        return tuple(codes_by_short_code.values())
+    return DEFAULT_LANGUAGE_PAIR
+
+
+def _build_language_entry(code, pair):
+    short_code = _get_language_info(code)["code"]
+    other_code = (
+        pair[1]
+        if short_code == _get_language_info(pair[0])["code"]
+        else pair[0]
+    )
+    other_name = _get_language_info(other_code)["name_local"]
+
+    return LanguageEntry(
+        code, short_code, other_code, other_name[:1].upper() + other_name[1:]
+    )
+
+
+@lru_cache(maxsize=None)
+def get_language_table():
+    """Returns a read-only mapping of each language code in LANGUAGES (as listed and
+    lowercased) to its LanguageEntry, so the helpers below are a single lookup per
+    call"""
+    pair = _get_language_pair()
+    codes = [code for code, _ in settings.LANGUAGES] + list(pair)
+
+    table = {}
+    for code in codes:
+        table[code] = table[code.lower()] = _build_language_entry(
+            code.lower(), pair
+        )
+    # an inactive translation is treated as the first language of the pair
+    table[None] = table[""] = table[pair[0]]
+    return MappingProxyType(table)
+
+
+@receiver(setting_changed)
+def clear_language_table(*, setting=None, **kwargs):
+    if setting in (None, "LANGUAGES"):
+        get_language_table.cache_clear()
+
+
+def get_language_entry(lang=None):
+    """Returns the LanguageEntry of `lang`, by default the active language"""
+    lang = lang or get_language()
+
+    try:
+        return get_language_table()[lang]
+    except KeyError:
+        # not in LANGUAGES, e.g. a locale activated explicitly
+        return _build_language_entry(lang.lower(), _get_language_pair())
+
 
 def get_language_code(lang=None):
     """Translate strings like fr-ca, en-ca to fr and en respectively
     If lang is not specified the current active language will be used.
     """
-    if not lang:
-        lang = get_language()
-    try:
-        return get_language_info(lang)["code"]
-    except TypeError:
-        return "en"
+    return get_language_entry(lang).short_code
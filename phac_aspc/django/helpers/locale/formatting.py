@@ -0,0 +1,96 @@
+"""Number, currency and date formatting for an explicit language.
+
+Unlike `locale_lang`, these never change the process-wide C locale, so they don't
+need a lock: concurrent requests in different languages format in parallel.
+
+Usage:
+
+    format_number(1234.5, "fr-ca", decimal_places=2)  # "1 234,50"
+    format_currency(1234.5, "en-ca")  # "$1,234.50"
+    format_date(date(2024, 1, 5), "fr-ca")  # "5 janvier 2024"
+"""
+
+from functools import lru_cache
+from typing import NamedTuple
+
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils import formats, numberformat
+from django.utils.translation import get_language, override
+
+from .code import get_language_code
+
+
+class LocaleConventions(NamedTuple):
+    decimal_separator: str
+    thousand_separator: str
+    grouping: int
+    # str.format pattern, with the formatted amount as its only argument
+    currency_format: str
+
+
+# the conventions of the en_CA and fr_CA locales used by locale_lang
+LOCALE_CONVENTIONS = {
+    "en": LocaleConventions(".", ",", 3, "${}"),
+    "fr": LocaleConventions(",", "\xa0", 3, "{}\xa0$"),
+}
+
+
+@lru_cache(maxsize=None)
+def _get_django_conventions(lang):
+    return LocaleConventions(
+        formats.get_format("DECIMAL_SEPARATOR", lang, use_l10n=True),
+        formats.get_format("THOUSAND_SEPARATOR", lang, use_l10n=True),
+        formats.get_format("NUMBER_GROUPING", lang, use_l10n=True),
+        "{}",
+    )
+
+
+def get_locale_conventions(lang=None):
+    """Returns the LocaleConventions for `lang`, by default the active language.
+    Languages without an entry in LOCALE_CONVENTIONS use Django's format
+    localization, without a currency symbol"""
+    lang = lang or get_language()
+
+    try:
+        return LOCALE_CONVENTIONS[get_language_code(lang)]
+    except KeyError:
+        return _get_django_conventions(lang)
+
+
+@receiver(setting_changed)
+def clear_locale_conventions(*, setting=None, **kwargs):
+    if setting in (None, "FORMAT_MODULE_PATH", "LANGUAGES"):
+        _get_django_conventions.cache_clear()
+
+
+def format_number(value, lang=None, decimal_places=None, grouping=True):
+    """Formats a number with the decimal and thousand separators of `lang`"""
+    conventions = get_locale_conventions(lang)
+
+    return numberformat.format(
+        value,
+        conventions.decimal_separator,
+        decimal_pos=decimal_places,
+        grouping=conventions.grouping if grouping else 0,
+        thousand_sep=conventions.thousand_separator,
+        force_grouping=grouping,
+        use_l10n=False,
+    )
+
+
+def format_currency(value, lang=None, decimal_places=2):
+    """Formats an amount in dollars, e.g. "-$1,234.50" or "-1 234,50 $" """
+    conventions = get_locale_conventions(lang)
+    amount = format_number(abs(value), lang, decimal_places=decimal_places)
+
+    return ("-" if value < 0 else "") + conventions.currency_format.format(
+        amount
+    )
+
+
+def format_date(value, lang=None, date_format="DATE_FORMAT"):
+    """Formats a date (or datetime) with one of Django's named formats (e.g.
+    "SHORT_DATE_FORMAT") or a format string, in `lang`"""
+    with override(lang or get_language()):
+        return formats.date_format(value, date_format, use_l10n=True)
@@ -1,5 +1,8 @@
 """Locale switching is global to the application, so we do it in a thread-safe
-context so no other parts of the application are affected."""
+context so no other parts of the application are affected.
+
+As the lock serializes every thread formatting in a locale, prefer the functions
+in `formatting`, which take the language explicitly and need no lock."""
 
 import locale
 import threading
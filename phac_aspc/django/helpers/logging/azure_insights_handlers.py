@@ -0,0 +1,357 @@
+"""Batched, non-blocking Azure Insights handler, for use alongside the PHAC helpers logging
+configuration"""
+
+import logging
+import os
+import queue
+import socket
+import threading
+import time
+import weakref
+from datetime import datetime, timezone
+
+import structlog
+
+from phac_aspc.django.helpers.logging.configure_logging import (
+    STRUCTLOG_PRE_PROCESSORS,
+)
+
+try:
+    import requests
+except (ImportError, ModuleNotFoundError) as exc:
+    raise ImportError(
+        "The `requests` package is required for use of the PHAC helpers batched Azure "
+        + "Insights handler. You must install this dependency your self."
+    ) from exc
+
+
+DEFAULT_INGESTION_ENDPOINT = "https://dc.services.visualstudio.com"
+
+# queued in place of an envelope to tell the worker thread to stop
+_STOP = object()
+
+
+# every handler, so a forked child can reset their workers
+_handlers = weakref.WeakSet()
+
+
+def _reset_handlers_after_fork():
+    for handler in list(_handlers):
+        handler._reset_worker_state()  # pylint: disable=protected-access
+
+
+if hasattr(os, "register_at_fork"):  # not available on Windows
+    # a forked child (e.g. a gunicorn --preload or Celery prefork worker) inherits
+    # the parent's queue, locks, and session, but not its worker thread
+    os.register_at_fork(after_in_child=_reset_handlers_after_fork)
+
+
+def parse_connection_string(connection_string):
+    """Returns the (instrumentation key, ingestion endpoint) pair from an Azure
+    Insights connection string"""
+    parts = {
+        key.strip().lower(): value.strip()
+        for key, _, value in (
+            part.partition("=")
+            for part in connection_string.split(";")
+            if "=" in part
+        )
+    }
+
+    instrumentation_key = parts.get("instrumentationkey")
+    if not instrumentation_key:
+        raise ValueError(
+            "The Azure Insights connection string must include an InstrumentationKey"
+        )
+
+    ingestion_endpoint = parts.get(
+        "ingestionendpoint", DEFAULT_INGESTION_ENDPOINT
+    ).rstrip("/")
+
+    return instrumentation_key, ingestion_endpoint
+
+
+class BatchedAzureInsightsHandler(logging.Handler):
+    """
+    Handler for exporting logs to Azure Insights in batches, from a background thread.
+
+    Unlike opencensus's AzureLogHandler, this handler does not run its records through
+    a formatter. Envelopes are built directly from the structlog event dict: the `event`
+    becomes the envelope's message and the remaining keys become its custom properties.
+    Records from structlog loggers already carry a processed event dict, records from
+    standard library loggers are run through `pre_chain` (by default, the same
+    processors used by the PHAC helpers logging configuration). The type names of
+    exceptions logged through structlog come from the `exception_type` added by
+    configuring logging with `add_exception_types=True`.
+
+    Emitting never blocks on the network. Envelopes are put on a bounded queue and a
+    worker thread posts them in batches of up to `max_batch_size`, at least every
+    `export_interval` seconds. When the queue is full, new envelopes are dropped and
+    counted. See `get_metrics()` for queue depth, sent, dropped, and failed counts.
+
+    As with the JSON post handlers, the handler does not try to export it's own logs,
+    to avoid failure loops when the ingestion endpoint is unreachable.
+    """
+
+    # pylint: disable=too-many-arguments,too-many-instance-attributes
+    def __init__(
+        self,
+        connection_string: str,
+        max_batch_size: int = 100,
+        export_interval: float = 5.0,
+        max_queue_size: int = 10000,
+        timeout: float = 5.0,
+        grace_period: float = 5.0,
+        fail_silent: bool = False,
+        pre_chain=STRUCTLOG_PRE_PROCESSORS,
+    ):
+        super().__init__()
+        self.logger = logging.getLogger(
+            f"{__name__}.{self.__class__.__name__}"
+        )
+
+        self.instrumentation_key, ingestion_endpoint = parse_connection_string(
+            connection_string
+        )
+        self.url = f"{ingestion_endpoint}/v2.1/track"
+
+        self.max_batch_size = max_batch_size
+        self.export_interval = export_interval
+        self.timeout = timeout
+        self.grace_period = grace_period
+        self.fail_silent = fail_silent
+        self.pre_chain = pre_chain
+
+        self.role_instance = socket.gethostname()
+        self.max_queue_size = max_queue_size
+
+        self._reset_worker_state()
+        _handlers.add(self)
+
+    def _reset_worker_state(self):
+        self._queue = queue.Queue(maxsize=self.max_queue_size)
+        self._session = requests.Session()
+
+        self._metrics_lock = threading.Lock()
+        self.sent_count = 0
+        self.dropped_count = 0
+        self.failed_count = 0
+
+        # the worker thread is only started on first emit, so processes that never
+        # log (e.g. most management commands) don't pay for it
+        self._worker = None
+        self._worker_pid = None
+        self._worker_lock = threading.Lock()
+
+    @property
+    def queue_depth(self):
+        """Number of envelopes waiting to be exported"""
+        return self._queue.qsize()
+
+    def get_metrics(self):
+        with self._metrics_lock:
+            return {
+                "queue_depth": self.queue_depth,
+                "sent": self.sent_count,
+                "dropped": self.dropped_count,
+                "failed": self.failed_count,
+            }
+
+    def emit(self, record):
+        if record.name == self.logger.name:
+            return
+
+        try:
+            envelope = self.record_to_envelope(record)
+        except Exception:  # pylint: disable=broad-except
+            self.handleError(record)
+            return
+
+        self._ensure_worker()
+
+        try:
+            self._queue.put_nowait(envelope)
+        except queue.Full:
+            with self._metrics_lock:
+                self.dropped_count += 1
+
+    def get_event_dict(self, record):
+        """Returns the structlog event dict for a record, running records from
+        standard library loggers through the pre chain"""
+        if isinstance(record.msg, dict) and hasattr(record, "_logger"):
+            # attached by structlog.stdlib.ProcessorFormatter.wrap_for_formatter,
+            # the pre chain has already been run by structlog itself
+            return record.msg.copy()
+
+        method_name = record.levelname.lower()
+        event_dict = {
+            "event": record.getMessage(),
+            "_record": record,
+            "_from_structlog": False,
+        }
+        if record.exc_info:
+            event_dict["exc_info"] = record.exc_info
+        if record.stack_info:
+            event_dict["stack_info"] = record.stack_info
+
+        for processor in self.pre_chain:
+            event_dict = processor(None, method_name, event_dict)
+
+        return structlog.stdlib.ProcessorFormatter.remove_processors_meta(
+            None, method_name, event_dict
+        )
+
+    def record_to_envelope(self, record):
+        event_dict = self.get_event_dict(record)
+
+        message = str(event_dict.pop("event", ""))
+        exception = event_dict.pop("exception", None)
+        # added by add_exception_type, before format_exc_info consumes the exc_info
+        # of structlog's records
+        exception_type = event_dict.pop("exception_type", None)
+        if exception_type is None and record.exc_info:
+            exception_type = record.exc_info[0].__name__
+        properties = {
+            key: value if isinstance(value, str) else str(value)
+            for key, value in event_dict.items()
+        }
+        # Application Insights severity levels run from 0 (verbose) to 4 (critical),
+        # i.e. DEBUG -> 0, INFO -> 1, ..., CRITICAL -> 4, clamping custom levels
+        severity_level = min(max(record.levelno // 10 - 1, 0), 4)
+
+        if exception is not None:
+            base_type = "ExceptionData"
+            base_data = {
+                "ver": 2,
+                "severityLevel": severity_level,
+                "properties": properties,
+                "exceptions": [
+                    {
+                        "id": 1,
+                        "outerId": 0,
+                        "typeName": exception_type or "Exception",
+                        "message": message,
+                        "hasFullStack": True,
+                        "stack": str(exception),
+                    }
+                ],
+            }
+        else:
+            base_type = "MessageData"
+            base_data = {
+                "ver": 2,
+                "message": message,
+                "severityLevel": severity_level,
+                "properties": properties,
+            }
+
+        tags = {"ai.cloud.roleInstance": self.role_instance}
+        if "request_id" in properties:
+            # bound by django_structlog's RequestMiddleware
+            tags["ai.operation.id"] = properties["request_id"]
+
+        return {
+            "name": f"Microsoft.ApplicationInsights.{base_type[:-4]}",
+            "time": datetime.fromtimestamp(
+                record.created, tz=timezone.utc
+            ).isoformat(),
+            "iKey": self.instrumentation_key,
+            "tags": tags,
+            "data": {"baseType": base_type, "baseData": base_data},
+        }
+
+    def flush(self, timeout=None):
+        """Blocks until every envelope queued before the call has been exported, or
+        until `timeout` (by default, the grace period) runs out"""
+        if not self._is_worker_running():
+            return
+
+        timeout = self.grace_period if timeout is None else timeout
+        flushed = threading.Event()
+        try:
+            self._queue.put(flushed, timeout=timeout)
+        except queue.Full:
+            return
+        flushed.wait(timeout)
+
+    def close(self):
+        if self._is_worker_running():
+            try:
+                self._queue.put(_STOP, timeout=self.grace_period)
+            except queue.Full:
+                pass
+            self._worker.join(self.grace_period)
+        self._session.close()
+        super().close()
+
+    def _is_worker_running(self):
+        return (
+            self._worker is not None
+            and self._worker_pid == os.getpid()
+            and self._worker.is_alive()
+        )
+
+    def _ensure_worker(self):
+        if self._is_worker_running():
+            return
+
+        with self._worker_lock:
+            if not self._is_worker_running():
+                self._worker_pid = os.getpid()
+                self._worker = threading.Thread(
+                    target=self._run,
+                    name=f"{self.__class__.__name__} worker",
+                    daemon=True,
+                )
+                self._worker.start()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch = []
+            flushed_events = []
+            deadline = time.monotonic() + self.export_interval
+
+            while len(batch) < self.max_batch_size:
+                try:
+                    item = self._queue.get(
+                        timeout=max(deadline - time.monotonic(), 0)
+                    )
+                except queue.Empty:
+                    break
+
+                if item is _STOP:
+                    stopping = True
+                    break
+                if isinstance(item, threading.Event):
+                    flushed_events.append(item)
+                    break
+                batch.append(item)
+
+            if batch:
+                self._export(batch)
+
+            for flushed in flushed_events:
+                flushed.set()
+
+    def _export(self, batch):
+        try:
+            response = self._session.post(
+                self.url, json=batch, timeout=self.timeout
+            )
+            response.raise_for_status()
+        except requests.RequestException as exception:
+            with self._metrics_lock:
+                self.failed_count += len(batch)
+
+            if not self.fail_silent:
+                self.logger.error(
+                    '%s\'s export of %s envelopes to URL "%s" failed',
+                    self.__class__.__name__,
+                    len(batch),
+                    self.url,
+                    exc_info=exception,
+                )
+        else:
+            with self._metrics_lock:
+                self.sent_count += len(batch)
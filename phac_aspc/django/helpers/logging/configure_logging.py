@@ -12,6 +12,23 @@ from phac_aspc.django.settings.utils import is_running_tests
 
 DATE_FORMAT = "%d/%b/%Y %H:%M:%S"
 
+
+def add_exception_type(_logger, _method_name, event_dict):
+    """Adds the name of the logged exception's type as `exception_type`. Must run
+    before `format_exc_info`, which replaces `exc_info` with the formatted traceback
+    """
+    exc_info = event_dict.get("exc_info")
+    if exc_info is True:
+        exc_info = sys.exc_info()
+
+    if isinstance(exc_info, BaseException):
+        event_dict["exception_type"] = type(exc_info).__name__
+    elif isinstance(exc_info, tuple) and exc_info[0] is not None:
+        event_dict["exception_type"] = exc_info[0].__name__
+
+    return event_dict
+
+
 STRUCTLOG_PRE_PROCESSORS = (
     structlog.contextvars.merge_contextvars,
     structlog.processors.TimeStamper(fmt="iso"),
@@ -29,6 +46,16 @@ STRUCTLOG_PRE_PROCESSORS = (
     structlog.processors.UnicodeDecoder(),
 )
 
+# STRUCTLOG_PRE_PROCESSORS, with add_exception_type running before format_exc_info
+_format_exc_info_index = STRUCTLOG_PRE_PROCESSORS.index(
+    structlog.processors.format_exc_info
+)
+STRUCTLOG_PRE_PROCESSORS_WITH_EXCEPTION_TYPE = (
+    *STRUCTLOG_PRE_PROCESSORS[:_format_exc_info_index],
+    add_exception_type,
+    *STRUCTLOG_PRE_PROCESSORS[_format_exc_info_index:],
+)
+
 _default_suffix = "phac_helper_"
 
 PHAC_HELPER_CONSOLE_FORMATTER_KEY = f"{_default_suffix}console_formatter"
@@ -47,6 +74,35 @@ PHAC_HELPER_NO_PASS_FILTER_KEY = f"{_default_suffix}no_pass_filter"
 # flag set to true when configuration function called
 is_phac_helper_logging_configuration_being_used = False
 
+# LogRecord attribute holding the output of each formatter that has rendered the record
+_RENDER_CACHE_ATTRIBUTE = f"_{_default_suffix}renders"
+
+
+class SharedRenderProcessorFormatter(structlog.stdlib.ProcessorFormatter):
+    """A structlog ProcessorFormatter that renders each record at most once per formatter
+    key. When several handlers share a formatter (e.g. the console and Azure handlers both
+    using the JSON formatter), the first handler to format a record runs the foreign pre
+    chain and renderer, and the other handlers reuse its output.
+
+    Rendered output is stored on the record itself, like `logging.Formatter` does
+    with `exc_text`, so the cache lives exactly as long as the record. This assumes
+    handlers and filters don't mutate a record's content after it's first formatted.
+    """
+
+    def __init__(self, *args, formatter_key=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.formatter_key = (
+            id(self) if formatter_key is None else formatter_key
+        )
+
+    def format(self, record):
+        renders = record.__dict__.setdefault(_RENDER_CACHE_ATTRIBUTE, {})
+
+        if self.formatter_key not in renders:
+            renders[self.formatter_key] = super().format(record)
+
+        return renders[self.formatter_key]
+
 
 def configure_uniform_std_lib_and_structlog_logging(
     lowest_level_to_log: Literal[
@@ -75,6 +131,7 @@ def configure_uniform_std_lib_and_structlog_logging(
             Any,
         ],
     ] = None,
+    add_exception_types: bool = False,
 ):
     """Configures both structlog and the standard library logging module, enforcing
     uniform logging behaviour between the two. Log handler and formatters are shared
@@ -92,11 +149,18 @@ def configure_uniform_std_lib_and_structlog_logging(
     structlog event-dict object in to a string for the handlers to emit. I recommend directly using,
     or wrapping/subclassing, existing structlog renderers here.
 
+    Each formatter renders a given log record at most once, no matter how many handlers
+    use it; see `SharedRenderProcessorFormatter`.
+
     `additional_filter_configs` takes standard logging dict config filter definitions.
     In Python 3.11 and above, you can instead directly provide filter functions/instances in your
     handler configs. In prior versions, you configure them separetly and reference them by key
     in your handler configs.
 
+    `add_exception_types` adds the name of each logged exception's type to the event
+    dict, as `exception_type` (see `add_exception_type`). The BatchedAzureInsightsHandler
+    needs it for the type names of exceptions logged through structlog.
+
     Note: by default, the built in console handler is muted running tests, because it makes
     pytest's own console output harder to follow (and pytest captures and reports errors
     after all tests have finished running anyway). You can over ride this behaviour by
@@ -107,10 +171,15 @@ def configure_uniform_std_lib_and_structlog_logging(
     # project logging, and means `logging.getLogger()` and `structlog.get_logger()` produce
     # consistent output (which is very nice to have when packages might be logging via either). See:
     # https://www.structlog.org/en/stable/standard-library.html#rendering-using-structlog-based-formatters-within-logging
+    pre_processors = (
+        STRUCTLOG_PRE_PROCESSORS_WITH_EXCEPTION_TYPE
+        if add_exception_types
+        else STRUCTLOG_PRE_PROCESSORS
+    )
     structlog.configure(
         processors=[
             structlog.stdlib.filter_by_level,
-            *STRUCTLOG_PRE_PROCESSORS,
+            *pre_processors,
             structlog.stdlib.ProcessorFormatter.wrap_for_formatter,
         ],
         # `wrapper_class` is the bound logger that you get back from
@@ -148,17 +217,21 @@ def configure_uniform_std_lib_and_structlog_logging(
         **(additional_formatter_functions or {}),
     }
 
-    def formatter_function_to_formatter_config(formatter_function):
+    def formatter_function_to_formatter_config(
+        formatter_key, formatter_function
+    ):
         return {
-            "()": structlog.stdlib.ProcessorFormatter,
-            "foreign_pre_chain": STRUCTLOG_PRE_PROCESSORS,
+            # handlers sharing a formatter key share a single render of each record
+            "()": SharedRenderProcessorFormatter,
+            "formatter_key": formatter_key,
+            "foreign_pre_chain": pre_processors,
             "datefmt": DATE_FORMAT,
             "processor": formatter_function,
         }
 
     formatters = {
         formatter_key: formatter_function_to_formatter_config(
-            formatter_function
+            formatter_key, formatter_function
         )
         for (formatter_key, formatter_function) in formatter_functions.items()
     }
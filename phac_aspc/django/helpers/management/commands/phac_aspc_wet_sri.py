@@ -0,0 +1,48 @@
+"""Compute subresource integrity hashes for the WET assets"""
+
+import base64
+import hashlib
+import os
+import pprint
+
+from django.core.management.base import BaseCommand, CommandError
+
+from phac_aspc.django.helpers.templatetags.phac_aspc_wet import (
+    WET_ASSETS,
+    jsdelivr,
+)
+
+
+def compute_sri_hash(file_path):
+    with open(file_path, "rb") as asset_file:
+        digest = hashlib.sha384(asset_file.read()).digest()
+    return f"sha384-{base64.b64encode(digest).decode()}"
+
+
+class Command(BaseCommand):
+    help = (
+        "Computes subresource integrity hashes from local copies of the WET "
+        "assets, for the configured WET_VERSION and THEME_VERSION, and prints "
+        "them as a WET_INTEGRITY setting."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "path",
+            help=(
+                "Directory containing the local copies, laid out as in the "
+                "wet-boew-dist and themes-dist packages, e.g. "
+                "wet-boew/js/wet-boew.min.js and GCWeb/js/theme.min.js"
+            ),
+        )
+
+    def handle(self, *args, **options):
+        integrity = {}
+        for pkg, asset in WET_ASSETS:
+            file_path = os.path.join(options["path"], *asset.split("/"))
+            if not os.path.isfile(file_path):
+                raise CommandError(f"No local copy of {asset} at {file_path}")
+
+            integrity[jsdelivr(pkg, asset)] = compute_sri_hash(file_path)
+
+        self.stdout.write(f"WET_INTEGRITY = {pprint.pformat(integrity)}")
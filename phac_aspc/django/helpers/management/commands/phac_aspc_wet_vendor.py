@@ -0,0 +1,96 @@
+"""Vendor WET and GCWeb assets from local archives, for self hosting"""
+
+import os
+import posixpath
+import tarfile
+import zipfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from phac_aspc.django.helpers.templatetags.phac_aspc_wet import (
+    WET_STATIC_ROOT,
+)
+
+# The top level directory of each package's assets, inside of its dist archive
+PACKAGE_ROOTS = {"wet-boew": "wet-boew", "themes": "GCWeb"}
+
+
+def read_archive(archive_path):
+    """Yields the (path, content) of every file in a zip or tar archive"""
+    if zipfile.is_zipfile(archive_path):
+        with zipfile.ZipFile(archive_path) as archive:
+            for member in archive.infolist():
+                if not member.is_dir():
+                    yield member.filename, archive.read(member)
+    elif tarfile.is_tarfile(archive_path):
+        with tarfile.open(archive_path) as archive:
+            for member in archive.getmembers():
+                if member.isfile():
+                    yield member.name, archive.extractfile(member).read()
+    else:
+        raise CommandError(f"{archive_path} is not a zip or tar archive")
+
+
+def get_package_path(archive_member_path):
+    """Returns the (package, path relative to the package's dist) of an archive
+    member, or None for files outside of the packages' asset directories"""
+    if ".." in archive_member_path.split("/"):
+        return None
+
+    parts = posixpath.normpath(archive_member_path).split("/")
+
+    # either at the root of the archive, or inside a single top level directory
+    # (e.g. wet-boew-dist-4.0.69/wet-boew/js/wet-boew.min.js)
+    for index, part in enumerate(parts[:2]):
+        for pkg, root in PACKAGE_ROOTS.items():
+            if part == root:
+                return pkg, "/".join(parts[index:])
+    return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Extracts the WET and GCWeb assets from local copies of the wet-boew-dist "
+        "and themes-dist archives, for the configured WET_VERSION and "
+        "THEME_VERSION, into a static files directory. Use with the "
+        "WET_SELF_HOSTED setting, and WetManifestStaticFilesStorage for hashed "
+        "and pre-compressed files."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "destination",
+            help="A directory listed in STATICFILES_DIRS",
+        )
+        parser.add_argument("archives", nargs="+", help="zip or tar archives")
+
+    def handle(self, *args, **options):
+        versions = {
+            "wet-boew": settings.WET_VERSION,
+            "themes": settings.THEME_VERSION,
+        }
+
+        vendored_counts = {pkg: 0 for pkg in PACKAGE_ROOTS}
+        for archive_path in options["archives"]:
+            for member_path, content in read_archive(archive_path):
+                package_path = get_package_path(member_path)
+                if package_path is None:
+                    continue
+
+                pkg, asset = package_path
+                file_path = os.path.join(
+                    options["destination"],
+                    *WET_STATIC_ROOT.split("/"),
+                    f"{pkg}-dist-{versions[pkg]}",
+                    *asset.split("/"),
+                )
+                os.makedirs(os.path.dirname(file_path), exist_ok=True)
+                with open(file_path, "wb") as asset_file:
+                    asset_file.write(content)
+                vendored_counts[pkg] += 1
+
+        for pkg, count in vendored_counts.items():
+            self.stdout.write(
+                f"Vendored {count} {pkg}-dist@{versions[pkg]} files"
+            )
@@ -0,0 +1,114 @@
+"""Extending sessions without writing them on every request"""
+
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+# Holds when the session's expiry was last extended, so requests in between can
+# skip it. Not security sensitive: the worst a tampered value can do is shorten the
+# user's own session, or extend it as often as SESSION_SAVE_EVERY_REQUEST would
+REFRESHED_COOKIE_NAME = "phac_aspc_session_refreshed"
+
+
+def get_session_refresh_threshold():
+    """Seconds a session's expiry can go without being extended, or 0 when sessions
+    are saved on every request"""
+    if settings.SESSION_SAVE_EVERY_REQUEST:
+        return 0
+
+    refresh_threshold = getattr(settings, "SESSION_REFRESH_THRESHOLD", 0)
+    if refresh_threshold >= settings.SESSION_COOKIE_AGE:
+        # sessions could expire before ever being extended, and the session timeout
+        # dialog would have no time left to warn users in
+        raise ImproperlyConfigured(
+            f"SESSION_REFRESH_THRESHOLD ({refresh_threshold}) must be less than "
+            + f"SESSION_COOKIE_AGE ({settings.SESSION_COOKIE_AGE})"
+        )
+    return refresh_threshold
+
+
+def touch_session_expiry(session):
+    """
+    Extends the session's expiry. For database backed sessions with unchanged data,
+    only the expiry date is updated, rather than re-serializing and saving the
+    whole session. Other sessions are marked as modified, to be saved as usual.
+    """
+    # Modules that read global state are best deffered to call time rather than
+    # module-load
+    # pylint: disable=import-outside-toplevel
+    from django.contrib.sessions.backends.db import SessionStore
+
+    if (
+        not settings.SESSION_SAVE_EVERY_REQUEST
+        and isinstance(session, SessionStore)
+        and session.session_key
+        and not session.modified
+        and session.get_expire_at_browser_close()
+    ):
+        updated = session.model.objects.filter(
+            session_key=session.session_key
+        ).update(expire_date=session.get_expiry_date())
+        if updated:
+            return
+
+    # saved by SessionMiddleware, which is also what extends the session cookie's
+    # expiry when it isn't a browser session
+    session.modified = True
+
+
+def refresh_session(request):
+    """Extends the request's session, and records when it was done"""
+    touch_session_expiry(request.session)
+    request.phac_aspc_session_refreshed_at = int(time.time())
+
+
+class SessionKeepAliveMiddleware:
+    """
+    Extends sessions at most once every SESSION_REFRESH_THRESHOLD seconds, rather
+    than saving them on every request. Only active when SESSION_SAVE_EVERY_REQUEST
+    is off. Must be listed after SessionMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        if (
+            settings.SESSION_SAVE_EVERY_REQUEST
+            or not hasattr(request, "session")
+            or response.status_code >= 500
+        ):
+            return response
+
+        refreshed_at = getattr(request, "phac_aspc_session_refreshed_at", None)
+        if refreshed_at is None:
+            try:
+                last_refreshed_at = int(
+                    request.COOKIES.get(REFRESHED_COOKIE_NAME, 0)
+                )
+            except ValueError:
+                last_refreshed_at = 0
+
+            if (
+                time.time() - last_refreshed_at
+                < get_session_refresh_threshold()
+                or request.session.is_empty()
+            ):
+                return response
+
+            refresh_session(request)
+            refreshed_at = request.phac_aspc_session_refreshed_at
+
+        response.set_cookie(
+            REFRESHED_COOKIE_NAME,
+            str(refreshed_at),
+            path=settings.SESSION_COOKIE_PATH,
+            domain=settings.SESSION_COOKIE_DOMAIN,
+            secure=settings.SESSION_COOKIE_SECURE,
+            httponly=True,
+            samesite=settings.SESSION_COOKIE_SAMESITE,
+        )
+        return response
@@ -0,0 +1,65 @@
+"""Static files storage for self hosted WET assets"""
+
+import gzip
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+from phac_aspc.django.helpers.templatetags.phac_aspc_wet import (
+    WET_STATIC_ROOT,
+)
+
+try:
+    import brotli
+except (ImportError, ModuleNotFoundError):
+    # brotli compression is optional, only gzip variants are written without it
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = {
+    ".css",
+    ".js",
+    ".json",
+    ".map",
+    ".svg",
+    ".html",
+    ".txt",
+    ".xml",
+}
+
+
+def write_compressed_variants(file_path):
+    """Writes .gz (and, if the brotli package is installed, .br) variants of a file
+    next to it, for web servers that serve pre-compressed static files"""
+    with open(file_path, "rb") as source_file:
+        content = source_file.read()
+
+    with open(f"{file_path}.gz", "wb") as gzip_file:
+        # a fixed mtime keeps the output identical across collectstatic runs
+        gzip_file.write(gzip.compress(content, compresslevel=9, mtime=0))
+
+    if brotli is not None:
+        with open(f"{file_path}.br", "wb") as brotli_file:
+            brotli_file.write(brotli.compress(content))
+
+
+class WetManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    ManifestStaticFilesStorage which also writes pre-compressed variants of the
+    content-hashed, self hosted WET assets
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        hashed_names = set()
+        for name, hashed_name, processed in super().post_process(
+            paths, dry_run, **options
+        ):
+            if hashed_name and name.startswith(f"{WET_STATIC_ROOT}/"):
+                hashed_names.add(hashed_name)
+            yield name, hashed_name, processed
+
+        if dry_run:
+            return
+
+        for hashed_name in sorted(hashed_names):
+            if os.path.splitext(hashed_name)[1] in COMPRESSIBLE_EXTENSIONS:
+                write_compressed_variants(self.path(hashed_name))
@@ -1,25 +1,81 @@
-"""Make all templatetags available to things like Jinja"""
-
-from .phac_aspc_auth import phac_aspc_auth_signin_microsoft_button
-from .phac_aspc_include_from_jinja import phac_aspc_include_from_jinja
-from .phac_aspc_inline_svg import phac_aspc_inline_svg
-from .phac_aspc_localization import phac_aspc_localization_lang
-from .phac_aspc_wet import (
-    WET_CDN_ROOT,
-    jsdelivr,
-    phac_aspc_wet_css,
-    phac_aspc_wet_scripts,
-    phac_aspc_wet_session_timeout_dialog,
-)
+"""Make all templatetags available to things like Jinja
 
+Tags are imported from their modules on first access, so importing the package (e.g.
+to register it as a Jinja global) doesn't import every tag library and its
+dependencies up front.
+"""
+
+import sys
+from importlib import import_module
+from types import ModuleType
+
+# tags sharing their module's name, see _TemplatetagsModule
+_SHADOWED_NAMES = ["phac_aspc_include_from_jinja", "phac_aspc_inline_svg"]
+
+# module each name is imported from, on first access
+_LAZY_NAMES = {
+    "phac_aspc_auth_signin_microsoft_button": "phac_aspc_auth",
+    "phac_aspc_localization_lang": "phac_aspc_localization",
+    "WET_CDN_ROOT": "phac_aspc_wet",
+    "jsdelivr": "phac_aspc_wet",
+    "phac_aspc_wet_css": "phac_aspc_wet",
+    "phac_aspc_wet_resource_hints": "phac_aspc_wet",
+    "phac_aspc_wet_scripts": "phac_aspc_wet",
+    "phac_aspc_wet_session_timeout_dialog": "phac_aspc_wet",
+}
+
+# pylint: disable=undefined-all-variable
 __all__ = [
     "phac_aspc_localization_lang",
     "WET_CDN_ROOT",
     "jsdelivr",
     "phac_aspc_wet_css",
+    "phac_aspc_wet_resource_hints",
     "phac_aspc_wet_scripts",
     "phac_aspc_wet_session_timeout_dialog",
     "phac_aspc_auth_signin_microsoft_button",
     "phac_aspc_include_from_jinja",
     "phac_aspc_inline_svg",
 ]
+
+
+def __getattr__(name):
+    try:
+        module_name = _LAZY_NAMES[name]
+    except KeyError:
+        raise AttributeError(
+            f"module {__name__!r} has no attribute {name!r}"
+        ) from None
+
+    value = getattr(import_module(f"{__name__}.{module_name}"), name)
+    # later lookups skip __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_NAMES) | set(_SHADOWED_NAMES))
+
+
+def _shadowed_tag(name):
+    def get_tag(_module):
+        return getattr(import_module(f"{__name__}.{name}"), name)
+
+    def ignore_submodule(_module, _value):
+        # the import system sets each imported submodule on its package
+        pass
+
+    return property(get_tag, ignore_submodule)
+
+
+class _TemplatetagsModule(ModuleType):
+    """Importing a submodule (as Django does for every tag library) sets it as an
+    attribute of the package, which would shadow the tags of the same name. Module
+    attributes can't take precedence over that, properties of the module's class can
+    """
+
+
+for _name in _SHADOWED_NAMES:
+    setattr(_TemplatetagsModule, _name, _shadowed_tag(_name))
+
+sys.modules[__name__].__class__ = _TemplatetagsModule
@@ -1,8 +1,12 @@
+from collections import ChainMap
+
 from django import template
-from django.template.loader import get_template
+from django.template import TemplateSyntaxError
 
 from phac_aspc.django.helpers.jinja_dtl_interop_utils import (
+    JINJA_BACKEND,
     assert_both_dtl_and_jinja_configured,
+    get_engine_template,
 )
 
 register = template.Library()
@@ -15,6 +19,38 @@ def phac_aspc_include_from_jinja(context, template_name):
     """
     assert_both_dtl_and_jinja_configured()
 
-    jinja_template = get_template(template_name)
+    # Jinja2 is an optional dependency, only imported once it's known to be configured
+    # pylint: disable=import-outside-toplevel
+    from django.template.backends.jinja2 import get_exception_info
+
+    import jinja2
+
+    backend_template = get_engine_template(JINJA_BACKEND, template_name)
+    jinja_template = backend_template.template
+
+    if jinja_template.environment.is_async:
+        # root_render_func returns an async generator in async environments, leave
+        # those to the backend's own render, with a flattened copy of the context
+        return backend_template.render(context.flatten())
 
-    return jinja_template.render(context.flatten())
+    # a layered view of the DTL context (most recently pushed first), rather than a
+    # flattened copy of it. Shared, so Jinja2 uses the view as is, which means also
+    # layering in the template's globals.
+    # Note: this mirrors the body of jinja2.Template.render, relying on Jinja2's
+    # private API (new_context's shared flag, root_render_func, handle_exception)
+    jinja_context = jinja_template.new_context(
+        ChainMap(*reversed(context.dicts), jinja_template.globals),
+        shared=True,
+    )
+    try:
+        try:
+            return jinja_template.environment.concat(
+                jinja_template.root_render_func(jinja_context)
+            )
+        except Exception:  # pylint: disable=broad-except
+            return jinja_template.environment.handle_exception()
+    except jinja2.TemplateSyntaxError as exc:
+        # translated the same way as by the Django Jinja2 backend's render
+        new = TemplateSyntaxError(exc.args)
+        new.template_debug = get_exception_info(exc)
+        raise new from exc
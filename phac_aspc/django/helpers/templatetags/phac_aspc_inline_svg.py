@@ -1,11 +1,178 @@
+import copy
+import logging
+import os
+import re
+from functools import lru_cache
 from xml.etree import ElementTree
 
 from django import template
+from django.conf import settings
 from django.contrib.staticfiles import finders
 from django.utils.safestring import mark_safe
 
 register = template.Library()
 
+logger = logging.getLogger(__name__)
+
+SVG_NAMESPACE = "http://www.w3.org/2000/svg"
+ElementTree.register_namespace("", SVG_NAMESPACE)
+
+# namespaces of the editor-specific elements and attributes dropped by minify_svg
+EDITOR_NAMESPACES = [
+    "http://www.inkscape.org/namespaces/inkscape",
+    "http://sodipodi.sourceforge.net/DTD/sodipodi-0.dtd",
+    "http://www.bohemiancoding.com/sketch/ns",
+    "http://ns.adobe.com/AdobeIllustrator/10.0/",
+]
+
+# SVGs shipped with this package, pre-rendered by warm_inline_svg_cache at startup
+KNOWN_SVG_PATHS = [
+    f"phac_aspc_helpers/phac_logos/{language}{variant}.svg"
+    for language in ["en", "fr", "en-fr", "fr-en"]
+    for variant in ["", "__dark"]
+]
+
+
+# minified SVG roots by file path, see precompile_inline_svgs
+precompiled_svgs = {}
+
+
+def _is_editor_specific(name):
+    return name in (f"{{{SVG_NAMESPACE}}}metadata", "metadata") or any(
+        name.startswith(f"{{{namespace}}}") for namespace in EDITOR_NAMESPACES
+    )
+
+
+def _collapse_whitespace(text):
+    if text is None or (not text.strip() and "\n" in text):
+        # indentation, as opposed to e.g. a space between two <tspan>s
+        return None
+    return re.sub(r"\s+", " ", text)
+
+
+def minify_svg(svg_root):
+    """Strips metadata, editor-specific elements and attributes, and redundant
+    whitespace from a parsed SVG, in place. Comments are already dropped by the
+    parser. Titles and descriptions are kept, as they're used by screen readers
+    """
+    for element in svg_root.iter():
+        for child in list(element):
+            if _is_editor_specific(child.tag):
+                element.remove(child)
+
+        for attribute in list(element.attrib):
+            if _is_editor_specific(attribute):
+                del element.attrib[attribute]
+
+        element.text = _collapse_whitespace(element.text)
+        element.tail = _collapse_whitespace(element.tail)
+
+    return svg_root
+
+
+def _list_static_svgs():
+    for finder in finders.get_finders():
+        for path, storage in finder.list(["CVS", ".*", "*~"]):
+            if path.endswith(".svg"):
+                try:
+                    yield path, storage.path(path)
+                except NotImplementedError:
+                    # storage that isn't on the local filesystem
+                    logger.warning(
+                        'Not precompiling SVG "%s", its storage has no file paths',
+                        path,
+                    )
+
+
+def precompile_inline_svgs(static_file_paths=None):
+    """Parses and minifies SVGs, by default every SVG available from the static file
+    finders, so phac_aspc_inline_svg never reads them from disk. Only used outside of
+    DEBUG. SVGs that can't be read or parsed are logged and skipped, and fail when
+    they're rendered instead.
+    """
+    if static_file_paths is None:
+        svgs = _list_static_svgs()
+    else:
+        svgs = [(path, finders.find(path)) for path in static_file_paths]
+
+    for path, file_path in svgs:
+        if file_path is None:
+            continue
+        try:
+            precompiled_svgs[file_path] = minify_svg(
+                ElementTree.parse(file_path).getroot()
+            )
+        except (ElementTree.ParseError, OSError):
+            logger.warning('Not precompiling SVG "%s"', path, exc_info=True)
+
+    _parse_svg.cache_clear()
+    _render_svg.cache_clear()
+
+
+@lru_cache(maxsize=256)
+def _find_svg(static_file_path):
+    return finders.find(static_file_path)
+
+
+@lru_cache(maxsize=256)
+def _parse_svg(file_path, mtime):  # pylint: disable=unused-argument
+    # mtime is only part of the cache key, so edits invalidate entries in DEBUG
+    if mtime is None and file_path in precompiled_svgs:
+        return precompiled_svgs[file_path]
+    return ElementTree.parse(file_path).getroot()
+
+
+@lru_cache(maxsize=256)
+def _render_svg(file_path, mtime, attributes):
+    svg_root = _parse_svg(file_path, mtime)
+    if attributes:
+        svg_root = copy.deepcopy(svg_root)
+
+    for attribute, value in attributes:
+        svg_root.set(attribute, value)
+
+    return ElementTree.tostring(svg_root, encoding="unicode", method="html")
+
+
+def _resolve_svg(static_file_path):
+    """Returns the (file path, mtime) pair used to key the render cache. Outside of
+    DEBUG, files are assumed not to change for the life of the process"""
+    file_path = _find_svg(static_file_path)
+
+    if not settings.DEBUG:
+        return file_path, None
+
+    if file_path is None or not os.path.exists(file_path):
+        # the file may have been added, moved, or removed since it was last found
+        _find_svg.cache_clear()
+        file_path = _find_svg(static_file_path)
+
+    return file_path, os.path.getmtime(file_path) if file_path else None
+
+
+def clear_inline_svg_cache():
+    precompiled_svgs.clear()
+    _find_svg.cache_clear()
+    _parse_svg.cache_clear()
+    _render_svg.cache_clear()
+
+
+def get_inline_svg_cache_info():
+    return {
+        "find": _find_svg.cache_info(),
+        "parse": _parse_svg.cache_info(),
+        "render": _render_svg.cache_info(),
+    }
+
+
+def warm_inline_svg_cache(static_file_paths=None):
+    """Pre-renders SVGs, by default the logos shipped with this package, so the first
+    requests to use them don't pay for finding and parsing them"""
+    for static_file_path in static_file_paths or KNOWN_SVG_PATHS:
+        file_path, mtime = _resolve_svg(static_file_path)
+        if file_path is not None:
+            _render_svg(file_path, mtime, ())
+
 
 @register.simple_tag
 def phac_aspc_inline_svg(static_file_path=None, **kwargs):
@@ -22,16 +189,14 @@ def phac_aspc_inline_svg(static_file_path=None, **kwargs):
     Returns:
         stringified XML to be inlined, i.e.:
         '<svg class="..." height="...">...</svg>'
-    """
-    ElementTree.register_namespace("", "http://www.w3.org/2000/svg")
-
-    svg_root = ElementTree.parse(finders.find(static_file_path)).getroot()
 
-    for attribute, value in kwargs.items():
-        svg_root.set(attribute, value)
+    Rendered SVGs are cached by path and attributes. In DEBUG, cache entries are
+    invalidated when the file's modification time changes. Otherwise, the logos
+    shipped with this package (or, with PHAC_ASPC_INLINE_SVG_PRECOMPILE_ALL, every
+    static SVG) are served minified from those precompiled at startup.
+    """
+    file_path, mtime = _resolve_svg(static_file_path)
 
-    svg_string = ElementTree.tostring(
-        svg_root, encoding="unicode", method="html"
+    return mark_safe(
+        _render_svg(file_path, mtime, tuple(sorted(kwargs.items())))
     )
-
-    return mark_safe(svg_string)
@@ -1,10 +1,39 @@
 """Related to implementing WET"""
 
 from django import template
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
 from django.utils.translation import get_language
 
 register = template.Library()
 
+# rendered output of context free string templates, by (name, language)
+_rendered_strings = {}
+
+
+class ContextFreeNode(template.Node):
+    def render(self, context):
+        return ""
+
+
+@register.tag
+def phac_aspc_context_free(parser, token):
+    """
+    Declares that a string template's output only depends on the active language,
+    so use_string can render it once per language, e.g.
+
+    {% load i18n phac_aspc_localization %}{% phac_aspc_context_free %}
+    {% translate "Try again" %}
+    """
+    return ContextFreeNode()
+
+
+@receiver(setting_changed)
+def clear_rendered_strings(*, setting=None, **kwargs):
+    if setting in (None, "TEMPLATES", "DEBUG"):
+        _rendered_strings.clear()
+
 
 @register.simple_tag()
 def phac_aspc_localization_lang():
@@ -23,10 +52,24 @@ def use_string(context, name, strings=None):
 
     phac_aspc/helpers/strings/{name}.html
 
+    Outside of DEBUG, the output of templates that use the phac_aspc_context_free
+    tag is cached per language.
     """
     if strings and name in strings:
         return strings[name]
 
-    return template.loader.get_template(
+    cache_key = (name, get_language())
+    if cache_key in _rendered_strings:
+        return _rendered_strings[cache_key]
+
+    string_template = template.loader.get_template(
         f"phac_aspc/helpers/strings/{name}.html", using="django"
-    ).render(context.flatten())
+    )
+
+    if string_template.template.nodelist.get_nodes_by_type(ContextFreeNode):
+        rendered_string = string_template.render({})
+        if not settings.DEBUG:
+            _rendered_strings[cache_key] = rendered_string
+        return rendered_string
+
+    return string_template.render(context.flatten())
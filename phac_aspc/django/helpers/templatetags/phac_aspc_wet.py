@@ -1,36 +1,95 @@
 """Related to implementing WET"""
 
 import json
+from functools import lru_cache
+from urllib.parse import urlparse
 
 from django import template, urls
 from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
 from django.template import loader
 from django.templatetags.static import static
 from django.urls.exceptions import NoReverseMatch
-from django.utils.html import format_html
+from django.utils.html import format_html, format_html_join
 from django.utils.safestring import mark_safe
+from django.utils.translation import get_language
+
+from phac_aspc.django.helpers.session import get_session_refresh_threshold
 
 register = template.Library()
 
 WET_CDN_ROOT = "https://cdn.jsdelivr.net/gh/wet-boew"
 
+# Where the phac_aspc_wet_vendor management command puts self hosted WET assets,
+# relative to the static files root
+WET_STATIC_ROOT = "phac_aspc_helpers/wet"
+
+JQUERY_URL = "https://ajax.googleapis.com/ajax/libs/jquery/2.2.4/jquery.min.js"
+JQUERY_INTEGRITY = (
+    "sha384-rY/jv8mMhqDabXSo+UCggqKtdmBfd3qC2/KvyTDNQ6PcUJXaxK1tMepoQda4g5vB"
+)
+# The copy of jQuery bundled with WET, used in place of JQUERY_URL when self hosted
+JQUERY_WET_ASSET = ("wet-boew", "wet-boew/js/jquery/2.2.4/jquery.min.js")
+
+# The (package, asset) pairs used by the WET templatetags
+WET_ASSETS = [
+    ("themes", "GCWeb/css/theme.min.css"),
+    ("wet-boew", "wet-boew/css/noscript.min.css"),
+    ("wet-boew", "wet-boew/js/wet-boew.min.js"),
+    ("themes", "GCWeb/js/theme.min.js"),
+]
+
+# Settings the precomputed WET tags depend on
+WET_TAG_SETTINGS = {
+    "WET_VERSION",
+    "THEME_VERSION",
+    "WET_INTEGRITY",
+    "WET_SELF_HOSTED",
+    "STATIC_URL",
+    "STORAGES",
+}
+
 
 def jsdelivr(pkg, asset):
-    """Construct a jsdelivr CDN URL for the provided WET package and asset."""
+    """Construct a jsdelivr CDN URL for the provided WET package and asset.
+
+    With the WET_SELF_HOSTED setting, the asset's static URL is returned instead.
+    See the phac_aspc_wet_vendor management command."""
     ver = settings.WET_VERSION if pkg == "wet-boew" else settings.THEME_VERSION
+    if getattr(settings, "WET_SELF_HOSTED", False):
+        return static(f"{WET_STATIC_ROOT}/{pkg}-dist-{ver}/{asset}")
     return f"{WET_CDN_ROOT}/{pkg}-dist@{ver}/{asset}"
 
 
-@register.simple_tag
-def phac_aspc_wet_css(base_only=False):
-    """Generate the CSS tags required for WET
+def jquery_url():
+    if getattr(settings, "WET_SELF_HOSTED", False):
+        return jsdelivr(*JQUERY_WET_ASSET)
+    return JQUERY_URL
 
-    If base_only is True, only those classes required for library features
-    will be included.  (For example displaying the session timeout dialog).
 
-    This should be used in the HEAD section of your templates.
-    """
+def integrity_attributes(url):
+    """Subresource integrity attributes for the URL, if its hash is in the
+    WET_INTEGRITY setting (see the phac_aspc_wet_sri management command)"""
+    integrity = {
+        JQUERY_URL: JQUERY_INTEGRITY,
+        **getattr(settings, "WET_INTEGRITY", {}),
+    }.get(url)
+    if not integrity:
+        return ""
+    return format_html(
+        ' integrity="{integrity}" crossorigin="anonymous"', integrity=integrity
+    )
+
+
+# The tags below only depend on settings, so are built once per version and flags,
+# rather than on every render. The versions are only part of the cache keys.
+# pylint: disable=unused-argument
+
+
+@lru_cache(maxsize=None)
+def _wet_css(wet_version, theme_version, base_only):
     css_url = (
         static("phac_aspc_helpers/base.css")
         if base_only
@@ -39,61 +98,150 @@ def phac_aspc_wet_css(base_only=False):
     no_script = jsdelivr("wet-boew", "wet-boew/css/noscript.min.css")
     return format_html(
         (
-            '<link rel="stylesheet" href="{css_url}">'
-            '<noscript><link rel="stylesheet" href="{no_script}"></noscript>'
+            '<link rel="stylesheet" href="{css_url}"{css_integrity}>'
+            '<noscript><link rel="stylesheet" href="{no_script}"'
+            "{no_script_integrity}></noscript>"
         ),
         css_url=css_url,
+        css_integrity=integrity_attributes(css_url),
         no_script=no_script,
+        no_script_integrity=integrity_attributes(no_script),
     )
 
 
-@register.simple_tag
-def phac_aspc_wet_scripts(include_jquery=True):
-    """Generate the script tags required for WET
-
-    If include_jquery is False, jquery will not be included
+def _jquery_script():
+    if jquery_url() != JQUERY_URL:
+        # self hosted
+        return format_html(
+            '<script src="{jquery_url}"{jquery_integrity}></script>',
+            jquery_url=jquery_url(),
+            jquery_integrity=integrity_attributes(jquery_url()),
+        )
 
-    This should be used directly before the closing </body> tag in your
-    templates.
-    """
-    jquery = (
+    return format_html(
         """
       <script
-        src="https://ajax.googleapis.com/ajax/libs/jquery/2.2.4/jquery.min.js"
-        integrity="sha384-rY/jv8mMhqDabXSo+UCggqKtdmBfd3qC2/KvyTDNQ6PcUJXaxK1tMepoQda4g5vB"
+        src="{jquery_url}"
+        integrity="{jquery_integrity}"
         crossorigin="anonymous"
-      ></script>"""
-        if include_jquery
-        else ""
+      ></script>""",
+        jquery_url=JQUERY_URL,
+        jquery_integrity=JQUERY_INTEGRITY,
     )
-    wet_js = mark_safe(jsdelivr("wet-boew", "wet-boew/js/wet-boew.min.js"))
-    gcweb_js = mark_safe(jsdelivr("themes", "GCWeb/js/theme.min.js"))
+
+
+@lru_cache(maxsize=None)
+def _wet_scripts(wet_version, theme_version, include_jquery):
+    jquery = _jquery_script() if include_jquery else ""
+    wet_js = jsdelivr("wet-boew", "wet-boew/js/wet-boew.min.js")
+    gcweb_js = jsdelivr("themes", "GCWeb/js/theme.min.js")
     return format_html(
         """
         {jquery}
-        <script src="{wet_js}"></script>
-        <script src="{gcweb_js}"></script>
+        <script src="{wet_js}"{wet_js_integrity}></script>
+        <script src="{gcweb_js}"{gcweb_js_integrity}></script>
         """,
-        jquery=mark_safe(jquery),
-        wet_js=wet_js,
-        gcweb_js=gcweb_js,
+        jquery=jquery,
+        wet_js=mark_safe(wet_js),
+        wet_js_integrity=integrity_attributes(wet_js),
+        gcweb_js=mark_safe(gcweb_js),
+        gcweb_js_integrity=integrity_attributes(gcweb_js),
     )
 
 
-@register.simple_tag(takes_context=True)
-def phac_aspc_wet_session_timeout_dialog(context, logout_url):
-    """Displays a dialog to the user warning them their session is about
-    to expire, with the option to continue or end their session
+@lru_cache(maxsize=None)
+def _wet_resource_hints(wet_version, theme_version, base_only, include_jquery):
+    preloads = [] if base_only else [("style", jsdelivr(*WET_ASSETS[0]))]
+    if include_jquery:
+        preloads.append(("script", jquery_url()))
+    preloads += [("script", jsdelivr(*asset)) for asset in WET_ASSETS[2:]]
 
-    WARNING: Wet expects your page to have at least 1 H1 element, if not
-    this component will not behave properly.  For this reason if no h1 is
-    present one is automatically appended to the document with its display set
-    to none.
+    origins = [urlparse(url).netloc for _kind, url in preloads]
+
+    return format_html_join(
+        "",
+        '<link rel="preconnect" href="https://{}">',
+        # self hosted assets don't need a connection to another origin
+        ((origin,) for origin in dict.fromkeys(origins) if origin),
+    ) + format_html_join(
+        "",
+        '<link rel="preload" href="{}" as="{}"{}>',
+        ((url, kind, integrity_attributes(url)) for kind, url in preloads),
+    )
+
+
+# pylint: enable=unused-argument
+
+
+@receiver(setting_changed)
+def clear_wet_tags(*, setting=None, **kwargs):
+    if setting is None or setting in WET_TAG_SETTINGS:
+        _wet_css.cache_clear()
+        _wet_scripts.cache_clear()
+        _wet_resource_hints.cache_clear()
+
+
+@register.simple_tag
+def phac_aspc_wet_css(base_only=False):
+    """Generate the CSS tags required for WET
+
+    If base_only is True, only those classes required for library features
+    will be included.  (For example displaying the session timeout dialog).
+
+    This should be used in the HEAD section of your templates.
     """
-    if not context["request"].user.is_authenticated:
-        return ""
+    return _wet_css(settings.WET_VERSION, settings.THEME_VERSION, base_only)
+
+
+@register.simple_tag
+def phac_aspc_wet_scripts(include_jquery=True):
+    """Generate the script tags required for WET
+
+    If include_jquery is False, jquery will not be included
+
+    This should be used directly before the closing </body> tag in your
+    templates.
+    """
+    return _wet_scripts(
+        settings.WET_VERSION, settings.THEME_VERSION, include_jquery
+    )
+
+
+@register.simple_tag
+def phac_aspc_wet_resource_hints(base_only=False, include_jquery=True):
+    """Generate preconnect and preload hints for the WET assets, so browsers
+    start fetching them before reaching the tags that use them
+
+    Use the same flags as with phac_aspc_wet_css and phac_aspc_wet_scripts. This
+    should be used early in the HEAD section of your templates.
+    """
+    return _wet_resource_hints(
+        settings.WET_VERSION, settings.THEME_VERSION, base_only, include_jquery
+    )
+
+
+def get_session_timeout_template():
+    """The session timeout dialog's template, only looked up once outside of DEBUG"""
+    if settings.DEBUG:
+        return loader.get_template(
+            "phac_aspc/helpers/wet/session_timeout.html"
+        )
+    return _get_session_timeout_template()
+
+
+@lru_cache(maxsize=None)
+def _get_session_timeout_template():
+    return loader.get_template("phac_aspc/helpers/wet/session_timeout.html")
 
-    session_alive = settings.SESSION_COOKIE_AGE * 1000
+
+# The language and script prefix are only part of the cache key, for reverse
+@lru_cache(maxsize=256)
+def _session_timeout_config(
+    logout_url, language, script_prefix, session_cookie_age, refresh_threshold
+):  # pylint: disable=unused-argument
+    # sessions are extended at most every refresh threshold seconds, so may expire
+    # up to that much earlier than SESSION_COOKIE_AGE after the latest request
+    session_alive = (session_cookie_age - refresh_threshold) * 1000
     reaction_time = 180000 if session_alive >= 300000 else session_alive * 0.2
 
     logouturl = logout_url
@@ -103,26 +251,56 @@ def phac_aspc_wet_session_timeout_dialog(context, logout_url):
         pass
 
     try:
-        return loader.get_template(
-            "phac_aspc/helpers/wet/session_timeout.html"
-        ).render(
+        return json.dumps(
             {
-                "config": json.dumps(
-                    {
-                        "inactivity": session_alive - reaction_time,
-                        "reactionTime": reaction_time,
-                        "refreshCallbackUrl": urls.reverse(
-                            "phac_aspc_helpers_session"
-                        ),
-                        "method": "PUT",
-                        "sessionalive": session_alive,
-                        "logouturl": logouturl,
-                    }
-                )
-            },
-            request=context["request"],
+                "inactivity": session_alive - reaction_time,
+                "reactionTime": reaction_time,
+                "refreshCallbackUrl": urls.reverse(
+                    "phac_aspc_helpers_session"
+                ),
+                "method": "PUT",
+                "sessionalive": session_alive,
+                "logouturl": logouturl,
+            }
         )
     except NoReverseMatch as exc:
         raise ImproperlyConfigured(
             "The WET urls are not loaded.  See README"
         ) from exc
+
+
+@receiver(setting_changed)
+def clear_session_timeout_dialog(*, setting=None, **kwargs):
+    if setting in (None, "ROOT_URLCONF", "TEMPLATES", "DEBUG"):
+        _get_session_timeout_template.cache_clear()
+        _session_timeout_config.cache_clear()
+
+
+@register.simple_tag(takes_context=True)
+def phac_aspc_wet_session_timeout_dialog(context, logout_url):
+    """Displays a dialog to the user warning them their session is about
+    to expire, with the option to continue or end their session
+
+    WARNING: Wet expects your page to have at least 1 H1 element, if not
+    this component will not behave properly.  For this reason if no h1 is
+    present one is automatically appended to the document with its display set
+    to none.
+
+    The dialog's configuration is cached per logout url and language, and its
+    template is only looked up once.
+    """
+    if not context["request"].user.is_authenticated:
+        return ""
+
+    return get_session_timeout_template().render(
+        {
+            "config": _session_timeout_config(
+                logout_url,
+                get_language(),
+                urls.get_script_prefix(),
+                settings.SESSION_COOKIE_AGE,
+                get_session_refresh_threshold(),
+            )
+        },
+        request=context["request"],
+    )
@@ -3,6 +3,8 @@
 from django.http import HttpResponse, HttpResponseNotFound
 from django.views.decorators.csrf import csrf_exempt
 
+from phac_aspc.django.helpers.session import refresh_session
+
 
 @csrf_exempt
 def session(request):
@@ -12,7 +14,7 @@ def session(request):
     """
     if request.method == "PUT":
         if request.user.is_authenticated:
-            request.session.modified = True
+            refresh_session(request)
             return HttpResponse("true")
 
         return HttpResponse("false")
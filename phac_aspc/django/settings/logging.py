@@ -22,25 +22,41 @@ if get_logging_env_value("USE_HELPERS_CONFIG"):
 
     additional_handler_configs = {}
     additional_filter_configs = {}
+    add_exception_types = False
 
     azure_insights_connection_string = get_logging_env_value(
         "AZURE_INSIGHTS_CONNECTION_STRING"
     )
     if azure_insights_connection_string is not None:
-        try:
-            from opencensus.ext.azure.log_exporter import AzureLogHandler
-        except (ImportError, ModuleNotFoundError) as exc:
-            raise ImportError(
-                "The `opencensus-ext-azure` package is required for use of PHAC helper's "
-                + "Azure Insights logging. You must install this dependency your self."
-            ) from exc
-
-        additional_handler_configs[f"{_default_suffix}azure_handler"] = {
-            "level": lowest_level_to_log,
-            "class": f"{AzureLogHandler.__module__}.{AzureLogHandler.__name__}",
-            "connection_string": azure_insights_connection_string,
-            "formatter": PHAC_HELPER_JSON_FORMATTER_KEY,
-        }
+        if get_logging_env_value("AZURE_INSIGHTS_BATCHED_EXPORT"):
+            # pylint: disable=ungrouped-imports
+            from phac_aspc.django.helpers.logging.azure_insights_handlers import (
+                BatchedAzureInsightsHandler,
+            )
+
+            # envelopes are built from the structlog event dict, no formatter needed,
+            # but the type of structlog's exceptions has to be added to it
+            add_exception_types = True
+            additional_handler_configs[f"{_default_suffix}azure_handler"] = {
+                "level": lowest_level_to_log,
+                "class": f"{BatchedAzureInsightsHandler.__module__}.{BatchedAzureInsightsHandler.__name__}",
+                "connection_string": azure_insights_connection_string,
+            }
+        else:
+            try:
+                from opencensus.ext.azure.log_exporter import AzureLogHandler
+            except (ImportError, ModuleNotFoundError) as exc:
+                raise ImportError(
+                    "The `opencensus-ext-azure` package is required for use of PHAC helper's "
+                    + "Azure Insights logging. You must install this dependency your self."
+                ) from exc
+
+            additional_handler_configs[f"{_default_suffix}azure_handler"] = {
+                "level": lowest_level_to_log,
+                "class": f"{AzureLogHandler.__module__}.{AzureLogHandler.__name__}",
+                "connection_string": azure_insights_connection_string,
+                "formatter": PHAC_HELPER_JSON_FORMATTER_KEY,
+            }
 
     slack_webhook_url = get_logging_env_value("SLACK_WEBHOOK_URL")
     if slack_webhook_url is not None:
@@ -84,4 +100,5 @@ if get_logging_env_value("USE_HELPERS_CONFIG"):
             else PHAC_HELPER_JSON_FORMATTER_KEY
         ),
         additional_filter_configs=additional_filter_configs,
+        add_exception_types=add_exception_types,
     )
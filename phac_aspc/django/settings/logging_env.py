@@ -2,8 +2,8 @@
 
 from phac_aspc.django.settings.utils.env_utils import (
     PHAC_ENV_PREFIX,
+    ResolvedEnvConfig,
     get_env,
-    get_env_value,
 )
 from phac_aspc.django.settings.utils.is_running_tests import is_running_tests
 
@@ -16,9 +16,14 @@ logging_env = get_env(
     MUTE_CONSOLE_HANDLER=(bool, is_running_tests()),
     PRETTY_FORMAT_CONSOLE_LOGS=(bool, False),
     AZURE_INSIGHTS_CONNECTION_STRING=(str, None),
+    AZURE_INSIGHTS_BATCHED_EXPORT=(bool, False),
     SLACK_WEBHOOK_URL=(str, None),
 )
 
+resolved_logging_env = ResolvedEnvConfig(
+    logging_env, prefix=LOGGING_ENV_PREFIX
+)
+
 
 def get_logging_env_value(key):
-    return get_env_value(logging_env, key, prefix=LOGGING_ENV_PREFIX)
+    return resolved_logging_env.get(key)
@@ -2,8 +2,8 @@
 
 from phac_aspc.django.settings.utils.env_utils import (
     PHAC_ENV_PREFIX,
+    ResolvedEnvConfig,
     get_env,
-    get_env_value,
 )
 
 OAUTH_ENV_PREFIX = f"{PHAC_ENV_PREFIX}OAUTH_"
@@ -19,11 +19,16 @@ oauth_env = get_env(
         str,
         "phac_aspc.django.helpers.auth.backend.PhacAspcOAuthBackend",
     ),
+    USER_CACHE=(bool, False),
+    USER_CACHE_ALIAS=(str, ""),
+    USER_CACHE_TIMEOUT=(int, 300),
 )
 
+resolved_oauth_env = ResolvedEnvConfig(oauth_env, prefix=OAUTH_ENV_PREFIX)
+
 
 def get_oauth_env_value(key):
-    return get_env_value(oauth_env, key, prefix=OAUTH_ENV_PREFIX)
+    return resolved_oauth_env.get(key)
 
 
 security_env_config = {
@@ -35,6 +40,9 @@ security_env_config = {
     # Sessions close when browser is closed
     "SESSION_EXPIRE_AT_BROWSER_CLOSE": (bool, True),
     # Every requests extends the session (This is required for the WET session
-    # plugin to function properly.)
+    # plugin to function properly, unless SessionKeepAliveMiddleware is used.)
     "SESSION_SAVE_EVERY_REQUEST": (bool, True),
+    # With SESSION_SAVE_EVERY_REQUEST off, seconds SessionKeepAliveMiddleware lets
+    # pass before extending a session again
+    "SESSION_REFRESH_THRESHOLD": (int, 0),
 }
@@ -2,7 +2,7 @@
 library settings requirements.
 """
 
-import inspect
+import sys
 
 from django.core import checks
 
@@ -18,11 +18,13 @@ def trigger_configuration_warning(msg, **kwargs):
     checks.register(phac_aspc_conf_warning)
 
 
-def warn_and_remove(items, dest_list):
+def warn_and_remove(items, dest_list, context=None):
     """If the items intersects with dest_list, raise a configuration warning and
-    remove it from the list returned to prevent errors."""
+    remove it from the list returned to prevent errors. The warning's id is
+    `context`, by default the name of the calling function."""
     ret = []
-    context = inspect.stack()[1].function
+    # pylint: disable=protected-access
+    context = context or sys._getframe(1).f_code.co_name
     hint = "You should remove it from your project to ensure proper ordering."
 
     for item in items:
@@ -46,7 +48,9 @@ def configure_apps(app_list):
     # pylint: disable=import-outside-toplevel
     from phac_aspc.django.settings.logging_env import get_logging_env_value
 
-    prefix_list = warn_and_remove(["modeltranslation", "axes"], app_list)
+    prefix_list = warn_and_remove(
+        ["modeltranslation", "axes"], app_list, context="configure_apps"
+    )
 
     logging_app = (
         ["django_structlog"]
@@ -61,6 +65,7 @@ def configure_apps(app_list):
             *logging_app,
         ],
         app_list,
+        context="configure_apps",
     )
 
     return prefix_list + app_list + suffix_list
@@ -86,7 +91,9 @@ def configure_authentication_backends(backend_list):
     )
 
     prefix_backends = warn_and_remove(
-        ["axes.backends.AxesStandaloneBackend"] + oauth_backend, backend_list
+        ["axes.backends.AxesStandaloneBackend"] + oauth_backend,
+        backend_list,
+        context="configure_authentication_backends",
     )
     return prefix_backends + backend_list
 
@@ -110,5 +117,6 @@ def configure_middleware(middleware_list):
         ]
         + logging_middleware,
         middleware_list,
+        context="configure_middleware",
     )
     return prefix + middleware_list
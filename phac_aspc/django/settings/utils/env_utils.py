@@ -2,9 +2,14 @@
 to configure PHAC helpers' behaviour
 """
 
-import inspect
 import os
+import sys
+from functools import lru_cache
 from importlib.util import find_spec
+from types import MappingProxyType
+
+from django.core.signals import setting_changed
+from django.dispatch import receiver
 
 import environ
 
@@ -27,9 +32,76 @@ def get_env_value(env, key, prefix=PHAC_ENV_PREFIX):
     )
 
 
+class ResolvedEnvConfig:
+    """The values of every key in an env's scheme, as returned by `get_env_value`.
+
+    Until Django's app registry is ready, settings may still be loading, so values
+    are resolved on every call. After that, they are resolved once and frozen, so
+    request time lookups don't re-read settings or re-cast env vars. `reload` (or
+    `reload_resolved_env_configs`) drops the frozen values, e.g. after a test
+    changes the env. Changing a prefixed setting reloads the config automatically.
+    """
+
+    def __init__(self, env, prefix=PHAC_ENV_PREFIX):
+        self.env = env
+        self.prefix = prefix
+        self.keys = [
+            name[len(prefix) :]
+            for name in env.scheme
+            if name.startswith(prefix)
+        ]
+        self._values = None
+        resolved_env_configs.append(self)
+
+    def _resolve(self):
+        # Modules that read global state are best deffered to call time rather than
+        # module-load
+        # pylint: disable=import-outside-toplevel
+        from django.apps import apps
+
+        if not apps.ready:
+            return None
+
+        self._values = MappingProxyType(
+            {
+                key: get_env_value(self.env, key, self.prefix)
+                for key in self.keys
+            }
+        )
+        return self._values
+
+    def get(self, key):
+        values = self._values if self._values is not None else self._resolve()
+
+        if values is None or key not in values:
+            return get_env_value(self.env, key, self.prefix)
+        return values[key]
+
+    def reload(self):
+        self._values = None
+
+
+resolved_env_configs = []
+
+
+def reload_resolved_env_configs(setting=None):
+    """Drops the frozen values of every ResolvedEnvConfig, or only of those the
+    named setting is prefixed for"""
+    for config in resolved_env_configs:
+        if setting is None or setting.startswith(config.prefix):
+            config.reload()
+
+
+@receiver(setting_changed)
+def reload_resolved_env_configs_on_setting_change(*, setting=None, **kwargs):
+    reload_resolved_env_configs(setting)
+
+
+@lru_cache(maxsize=None)
 def find_env_file(path):
     """Traverse directories backwards starting at `path`, returns the path of the
-    first .env file found, or `None` otherwise.
+    first .env file found, or `None` otherwise. Results are cached for the life of
+    the process, see `clear_env_file_caches`.
     """
 
     # look for .env file in provided path
@@ -50,6 +122,27 @@ def find_env_file(path):
     return None
 
 
+@lru_cache(maxsize=None)
+def _get_settings_dir(settings_module):
+    return os.path.dirname(find_spec(settings_module).origin)
+
+
+@lru_cache(maxsize=None)
+def _read_env_file(env_file):
+    # read_env only sets env vars that aren't set already, so once a file's been
+    # read, reading it again is a no-op
+    if os.path.isfile(env_file):
+        environ.Env.read_env(env_file)
+
+
+def clear_env_file_caches():
+    """Forgets which .env files were found and read, e.g. so a test can point get_env
+    at a new one"""
+    _get_settings_dir.cache_clear()
+    find_env_file.cache_clear()
+    _read_env_file.cache_clear()
+
+
 def get_env(prefix=PHAC_ENV_PREFIX, **conf):
     """Return django-environ configured with the provided values and
     using the prefix.
@@ -63,7 +156,7 @@ def get_env(prefix=PHAC_ENV_PREFIX, **conf):
     Will attempt to find and load from a .env, starting in the directory of the consuming
     application's `DJANGO_SETTINGS_MODULE` and traveling back towards root. Continues
     even if no .env is found, with every env var taking it's default from `conf`
-    instead.
+    instead. The .env file is only located and read once per process.
 
     See https://django-environ.readthedocs.io/en/latest/api.html#environ.Env for
     additional information on the scheme.
@@ -75,17 +168,16 @@ def get_env(prefix=PHAC_ENV_PREFIX, **conf):
 
     env = environ.Env(**scheme)
 
-    settings_path_of_consuming_app = os.path.dirname(
-        find_spec(os.getenv("DJANGO_SETTINGS_MODULE")).origin
+    nearest_ancestor_dot_env = find_env_file(
+        _get_settings_dir(os.getenv("DJANGO_SETTINGS_MODULE"))
     )
-    nearest_ancestor_dot_env = find_env_file(settings_path_of_consuming_app)
-    if nearest_ancestor_dot_env and os.path.isfile(nearest_ancestor_dot_env):
-        environ.Env.read_env(nearest_ancestor_dot_env)
+    if nearest_ancestor_dot_env:
+        _read_env_file(nearest_ancestor_dot_env)
 
     return env
 
 
-def global_from_env(prefix=PHAC_ENV_PREFIX, **conf):
+def global_from_env(prefix=PHAC_ENV_PREFIX, module=None, **conf):
     """Create named global variables based on the provided environment variable
     scheme.  Variables defined in the scheme will be inserted into the calling
     module's globals and prefixed with `PHAC_ASPC_` when fetching the
@@ -96,10 +188,15 @@ def global_from_env(prefix=PHAC_ENV_PREFIX, **conf):
     `PHAC_ASPC_`.
 
     conf is a dictionary used to generate the scheme for django-environ.
+
+    module can be used to insert the globals in to a module other than the caller's.
     """
 
-    mod = inspect.getmodule(inspect.stack()[1][0])
+    # pylint: disable=protected-access
+    module_globals = (
+        vars(module) if module is not None else sys._getframe(1).f_globals
+    )
     env = get_env(prefix, **conf)
 
     for name in conf:
-        setattr(mod, name, get_env_value(env, name, prefix))
+        module_globals[name] = get_env_value(env, name, prefix)
@@ -5,3 +5,11 @@ WET_VERSION = "4.0.69"
 
 # The version of GCWeb to use
 THEME_VERSION = "13.9.0-gcweb"
+
+# Subresource integrity hashes of the WET assets, by URL. See the phac_aspc_wet_sri
+# management command
+WET_INTEGRITY = {}
+
+# Serve the WET assets as static files, rather than from the jsdelivr CDN. See the
+# phac_aspc_wet_vendor management command
+WET_SELF_HOSTED = False
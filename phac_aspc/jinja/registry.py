@@ -1,36 +1,116 @@
 import inspect
+import os
 
-from jinja2 import Environment, FileSystemLoader
+from django.conf import settings
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
 
 
 class JinjaRegistry:
+    # environments kept for reuse by get_environment, least recently used first out
+    max_environments = 16
+
     def __init__(self):
         self.globals = {}
         self.filters = {}
         self.tests = {}
         self.extensions = []
 
+        # used by environments that aren't given a bytecode_cache option
+        self.bytecode_cache = None
+
+        # environments by their options' cache key, reused by get_environment
+        self._environments = {}
+
     def include_default_helpers(self):
         from phac_aspc.jinja import standard_helpers
 
+    @staticmethod
+    def _get_options_key(options):
+        # options are compared by value, except for objects like loaders, which are
+        # only the same option when they're the same object
+        key = tuple(
+            sorted(
+                (name, tuple(value) if isinstance(value, list) else value)
+                for name, value in options.items()
+            )
+        )
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
     def get_environment(self, **options):
+        """
+        Returns an environment with the registered globals, filters, tests, and
+        extensions. Environments are reused across calls with identical options, so
+        the returned environment is shared: register helpers on the registry, rather
+        than modifying the environment's globals, filters, or tests.
 
+        Unless given as options, the registry's bytecode_cache is used and, in a
+        Django project, templates are only auto reloaded in DEBUG.
+        """
         self.include_default_helpers()
 
-        env = Environment(**options)
+        options.setdefault("bytecode_cache", self.bytecode_cache)
+        if settings.configured:
+            options.setdefault("auto_reload", settings.DEBUG)
+
+        key = self._get_options_key(options)
+        if key in self._environments:
+            # moved to the end, as the most recently used
+            env = self._environments.pop(key)
+            self._environments[key] = env
+            return env
+
+        # extensions are added last, so they can build on the registered helpers
+        env = Environment(
+            **{
+                key: value
+                for key, value in options.items()
+                if key != "extensions"
+            }
+        )
         env.globals.update(self.globals)
         env.filters.update(self.filters)
         env.tests.update(self.tests)
-        for extension in self.extensions:
+        for extension in [*self.extensions, *options.get("extensions", [])]:
             env.add_extension(extension)
 
+        if key is not None:
+            self._environments[key] = env
+            if len(self._environments) > self.max_environments:
+                # e.g. a caller passing a new loader on every call
+                del self._environments[next(iter(self._environments))]
+
         return env
 
+    def clear_environments(self):
+        """
+        Forget previously built environments, e.g. after registering new helpers.
+        """
+        self._environments.clear()
+
+    def use_filesystem_bytecode_cache(self, directory=None, **kwargs):
+        """
+        Cache compiled templates on disk, by default in the system's temp directory,
+        so that each new process doesn't recompile every template from source.
+        """
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+        self.bytecode_cache = FileSystemBytecodeCache(directory, **kwargs)
+        self.clear_environments()
+
+        return self.bytecode_cache
+
     def add_extension(self, extension):
         """
         Add a Jinja2 extension to the environment.
         """
         self.extensions.append(extension)
+        self.clear_environments()
 
     @staticmethod
     def _get_name_and_value(name=None, value=None):
@@ -50,6 +130,7 @@ class JinjaRegistry:
         name, value = self._get_name_and_value(name, value)
 
         self.globals[name] = value
+        self.clear_environments()
 
         return value
 
@@ -57,6 +138,7 @@ class JinjaRegistry:
         name, value = self._get_name_and_value(name, value)
 
         self.filters[name] = value
+        self.clear_environments()
 
         return value
 
@@ -64,6 +146,7 @@ class JinjaRegistry:
         name, value = self._get_name_and_value(name, value)
 
         self.tests[name] = value
+        self.clear_environments()
 
         return value
 
@@ -1,13 +1,28 @@
-from urllib.parse import quote, urlencode, urlparse, urlunparse
+from collections import deque
+from functools import lru_cache
+from urllib.parse import quote, unquote, urlencode
 
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
 from django.templatetags.static import static
-from django.urls import reverse
+from django.urls import get_script_prefix, get_urlconf, reverse, translate_url
 from django.utils.translation import activate, get_language, override
 
 from jinja2 import pass_context
 from jinja2.ext import Extension, nodes
+from jinja2.lexer import (
+    TOKEN_DOT,
+    TOKEN_LPAREN,
+    TOKEN_NAME,
+    TOKEN_RPAREN,
+    TOKEN_STRING,
+    TOKEN_TILDE,
+    Token,
+)
 
 import phac_aspc.django.helpers.templatetags as phac_aspc
+from phac_aspc.django.helpers.locale.code import get_language_entry
 from phac_aspc.jinja.registry import registry as r
 
 # basic python builtins
@@ -56,30 +71,174 @@ class LanguageExtension(Extension):
         return output
 
 
-@r.add_global
-def convert_url_other_lang(url_str):
-    parsed_url = urlparse(url_str)
-    path = parsed_url.path
-    query = parsed_url.query
+@lru_cache(maxsize=1024)
+def _cached_reverse(
+    language, script_prefix, thread_urlconf, viewname, urlconf, args, kwargs
+):  # pylint: disable=unused-argument,too-many-arguments
+    # language, script prefix, and thread urlconf are only part of the cache key,
+    # reverse reads them from django itself
+    return reverse(
+        viewname, urlconf, args, dict(kwargs) if kwargs is not None else None
+    )
+
+
+def cached_reverse(viewname, urlconf=None, args=None, kwargs=None, **options):
+    """
+    memoized drop in for django's reverse, used as the url global by
+    StaticUrlFoldingExtension. Falls back to reverse for unhashable arguments
+    """
+    if options:
+        return reverse(viewname, urlconf, args, kwargs, **options)
+
+    try:
+        return _cached_reverse(
+            get_language(),
+            get_script_prefix(),
+            get_urlconf(),
+            viewname,
+            urlconf,
+            tuple(args) if args is not None else None,
+            tuple(sorted(kwargs.items())) if kwargs is not None else None,
+        )
+    except TypeError:
+        return reverse(viewname, urlconf, args, kwargs)
+
+
+@receiver(setting_changed)
+def clear_reverse_cache(*, setting=None, **kwargs):
+    if setting in (None, "ROOT_URLCONF", "LANGUAGES", "FORCE_SCRIPT_NAME"):
+        _cached_reverse.cache_clear()
+
+
+class StaticUrlFoldingExtension(Extension):
+    """
+    opt-in, resolves static("literal") and url("literal") calls when templates are
+    compiled, rather than on every render, e.g.
 
-    if "fr-ca" in path:
-        new_path = path.replace("/fr-ca", "")
-    else:
-        new_path = "/fr-ca" + path
+    registry.add_extension(StaticUrlFoldingExtension)
 
-    new_url = parsed_url._replace(path=new_path)
+    url calls are only folded when they reverse to the same path in every language
+    of settings.LANGUAGES (i.e. not for i18n_patterns), other url calls go through
+    cached_reverse. Folded urls keep the script prefix out of the compiled template,
+    it's prepended on render, as templates may be compiled outside of a request (or
+    under another SCRIPT_NAME). As resolved values are part of the compiled template,
+    clear any persistent bytecode cache when deploying new static files or URLs
+    """
 
-    if "login" in path and "next" in query:
-        if "fr-ca" in path:
-            new_query = query.replace("next=/fr-ca", "next=")
-        else:
-            new_query = query.replace("next=", "next=/fr-ca")
-    else:
-        new_query = query
+    script_prefix_global = "_phac_aspc_script_prefix"
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.globals["url"] = cached_reverse
+        environment.globals[self.script_prefix_global] = get_script_prefix
+
+    def _fold_static(self, path, lineno):
+        return [Token(lineno, TOKEN_STRING, static(path))]
+
+    def _fold_url(self, viewname, lineno):
+        script_prefix = get_script_prefix()
+        paths = set()
+        for language_code, _name in settings.LANGUAGES:
+            with override(language_code):
+                paths.add(reverse(viewname))
+        if len(paths) != 1:
+            return None
+
+        # i.e. (_phac_aspc_script_prefix() ~ "path/without/prefix")
+        return [
+            Token(lineno, TOKEN_LPAREN, "("),
+            Token(lineno, TOKEN_NAME, self.script_prefix_global),
+            Token(lineno, TOKEN_LPAREN, "("),
+            Token(lineno, TOKEN_RPAREN, ")"),
+            Token(lineno, TOKEN_TILDE, "~"),
+            Token(lineno, TOKEN_STRING, paths.pop()[len(script_prefix) :]),
+            Token(lineno, TOKEN_RPAREN, ")"),
+        ]
+
+    def filter_stream(self, stream):
+        folders = {"static": self._fold_static, "url": self._fold_url}
+        stream = iter(stream)
+        pending = deque()
+        previous = None
+
+        def next_token():
+            return pending.popleft() if pending else next(stream, None)
+
+        while (token := next_token()) is not None:
+            if (
+                token.test(TOKEN_NAME)
+                and token.value in folders
+                and not (previous and previous.test(TOKEN_DOT))
+            ):
+                lookahead = [next_token() for _ in range(3)]
+                if [t.type if t else None for t in lookahead] == [
+                    TOKEN_LPAREN,
+                    TOKEN_STRING,
+                    TOKEN_RPAREN,
+                ]:
+                    try:
+                        folded = folders[token.value](
+                            lookahead[1].value, token.lineno
+                        )
+                    except Exception:  # pylint: disable=broad-except
+                        # left for the render to raise, as it would unfolded
+                        folded = None
+
+                    if folded is not None:
+                        yield from folded
+                        previous = folded[-1]
+                        continue
+
+                pending.extendleft(reversed([t for t in lookahead if t]))
+
+            previous = token
+            yield token
+
+
+@lru_cache(maxsize=1024)
+def _cached_translate_path(
+    path, language, script_prefix, thread_urlconf, other_language
+):  # pylint: disable=unused-argument
+    # like _cached_reverse, the active language, script prefix, and thread urlconf
+    # are only part of the cache key, resolve and reverse read them from django
+    return translate_url(path, other_language)
+
+
+@receiver(setting_changed)
+def clear_translate_path_cache(*, setting=None, **kwargs):
+    if setting in (None, "ROOT_URLCONF", "LANGUAGES", "FORCE_SCRIPT_NAME"):
+        _cached_translate_path.cache_clear()
 
-    new_url = new_url._replace(query=new_query)
 
-    return urlunparse(new_url)
+@r.add_global
+def convert_url_other_lang(url_str):
+    """
+    Translates a path (and optional query) of the active language to the other
+    language, the way django's translate_url does: the path is resolved and the
+    matching view reversed in the other language, so only URLs under
+    i18n_patterns change. A `next` parameter is translated the same way, the rest
+    of the query is kept as is.
+    """
+    path, separator, query = url_str.partition("?")
+    language = get_language()
+    cache_key = (
+        language,
+        get_script_prefix(),
+        get_urlconf(),
+        get_language_entry(language).other_code,
+    )
+
+    if "next=" in query:
+        params = query.split("&")
+        for i, param in enumerate(params):
+            if param.startswith("next="):
+                next_path = unquote(param[len("next=") :])
+                translated = _cached_translate_path(next_path, *cache_key)
+                if translated != next_path:
+                    params[i] = "next=" + quote(translated, safe="/")
+        query = "&".join(params)
+
+    return _cached_translate_path(path, *cache_key) + separator + query
 
 
 @r.add_global
@@ -100,8 +259,7 @@ def get_lang_code():
     """
     Provides the language code (en-ca or fr-ca) for the current language
     """
-    current_lang = get_language()
-    return current_lang.lower()
+    return get_language_entry().code
 
 
 @r.add_global
@@ -111,10 +269,7 @@ def get_other_lang_code():
     is en-ca, then the other lang is fr-ca), this is currently used for
     setting the lang tag in the button switch UI
     """
-    current_lang = get_language()
-    if "en" in current_lang.lower():
-        return "fr-ca"
-    return "en-ca"
+    return get_language_entry().other_code
 
 
 @r.add_global
@@ -122,10 +277,7 @@ def get_other_lang():
     """
     Returns the language label ("Français" or "English") for the other language not currently being used.
     """
-    current_lang = get_language()
-    if "en" in current_lang.lower():
-        return "Français"
-    return "English"
+    return get_language_entry().other_label
 
 
 @r.add_global
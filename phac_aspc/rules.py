@@ -1,6 +1,10 @@
 # This module is a wrapper around the django-rules package
+from contextlib import contextmanager
+from contextvars import ContextVar
 from unittest.mock import patch
 
+from django.db.models import QuerySet
+
 try:
     import rules
     from rules import add_rule, predicate
@@ -12,6 +16,85 @@ class NonExistentRuleException(Exception):
     pass
 
 
+class RuleCache:
+    """
+    memoized test_rule results for a single scope (e.g. a request),
+    keyed by (rule name, user, obj)
+    """
+
+    def __init__(self):
+        self.results = {}
+        self.hits = 0
+        self.misses = 0
+
+    def invalidate(self, name=None):
+        if name is None:
+            self.results.clear()
+        else:
+            for key in [key for key in self.results if key[0] == name]:
+                del self.results[key]
+
+    def get_stats(self):
+        return {"hits": self.hits, "misses": self.misses}
+
+
+_rule_cache = ContextVar("phac_aspc_rule_cache", default=None)
+
+# names of rules whose results are never memoized, see auto_rule(cache=False)
+uncached_rules = set()
+
+# set-based implementations of rules by name, see auto_rule(many=...)
+bulk_rules = {}
+
+# Q-expression builders of rules by name, see auto_rule(filter=...)
+rule_filters = {}
+
+
+@contextmanager
+def rule_cache():
+    """
+    memoizes test_rule results within the block, e.g.
+
+    with rule_cache():
+        # predicates only run once per (rule, user, obj)
+        ...
+
+    RuleCacheMiddleware does this for the duration of each request
+    """
+    token = _rule_cache.set(RuleCache())
+    try:
+        yield _rule_cache.get()
+    finally:
+        _rule_cache.reset(token)
+
+
+def invalidate_rule_cache(name=None):
+    """
+    drop memoized results for the current scope, for a single rule or all of them,
+    e.g. after a request changes data that predicates depend on
+    """
+    cache = _rule_cache.get()
+    if cache is not None:
+        cache.invalidate(name)
+
+
+def get_rule_cache_stats():
+    """hit/miss counts for the current scope, or None outside of one"""
+    cache = _rule_cache.get()
+    return cache.get_stats() if cache is not None else None
+
+
+class RuleCacheMiddleware:
+    """scopes a rule cache to each request"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with rule_cache():
+            return self.get_response(request)
+
+
 # this is the "private" version, for mocking purposes
 def _test_rule(name, user=None, obj=None):
     if not rules.rule_exists(name):
@@ -20,11 +103,195 @@ def _test_rule(name, user=None, obj=None):
     return rules.test_rule(name, user, obj)
 
 
-def test_rule(*args, **kwargs):
-    return _test_rule(*args, **kwargs)
+def test_rule(name, user=None, obj=None):
+    cache = _rule_cache.get()
+    if cache is None or name in uncached_rules:
+        return _test_rule(name, user, obj)
+
+    key = (name, user, obj)
+    try:
+        result = cache.results[key]
+    except KeyError:
+        pass
+    except TypeError:
+        # unhashable user or obj, e.g. an unsaved model instance
+        return _test_rule(name, user, obj)
+    else:
+        cache.hits += 1
+        return result
+
+    cache.misses += 1
+    result = cache.results[key] = _test_rule(name, user, obj)
+    return result
+
+
+def add_bulk_rule(name, bulk_fn):
+    """
+    register a set-based implementation for an existing rule, used by test_rule_many
+
+    bulk_fn(user, objs) returns the primary keys of the permitted objs, either as
+    a collection of ids or as a queryset of the permitted objects, e.g.
+
+    def can_edit_many(user, objs):
+        return Book.objects.filter(pk__in=[obj.pk for obj in objs], author__user=user)
+
+    add_bulk_rule("can_edit", can_edit_many)
+    """
+    bulk_rules[name] = bulk_fn
+
+
+# this is the "private" version, for mocking purposes
+def _test_rule_many(name, user, objs):
+    if not rules.rule_exists(name):
+        raise NonExistentRuleException(f"rule {name} does not exist")
+
+    bulk_fn = bulk_rules.get(name)
+    if bulk_fn is None and name in rule_filters and objs:
+        # the rule's filter doubles as a set-based implementation
+        # pylint: disable=protected-access
+        manager = type(objs[0])._default_manager
+        permitted = manager.filter(
+            rule_filters[name](user), pk__in=[obj.pk for obj in objs]
+        )
+    elif bulk_fn is None:
+        return [test_rule(name, user, obj) for obj in objs]
+    else:
+        permitted = bulk_fn(user, objs)
+
+    if isinstance(permitted, QuerySet):
+        permitted = permitted.values_list("pk", flat=True)
+    permitted_ids = set(permitted)
+
+    return [obj.pk in permitted_ids for obj in objs]
+
+
+def test_rule_many(name, user, objs):
+    """
+    tests a rule against many objects, returning a list of booleans in the same
+    order as objs, e.g.
 
+    editable = [
+        book
+        for book, can_edit in zip(books, test_rule_many("can_edit", user, books))
+        if can_edit
+    ]
 
-def auto_rule(fn):
+    uses the rule's set-based implementation when it has one (a single query
+    instead of one per object), and falls back to testing each object otherwise
+    """
+    objs = list(objs)
+    results = _test_rule_many(name, user, objs)
+
+    cache = _rule_cache.get()
+    if cache is not None and name not in uncached_rules:
+        for obj, result in zip(objs, results):
+            try:
+                cache.results[(name, user, obj)] = result
+            except TypeError:
+                pass
+
+    return results
+
+
+def add_rule_filter(name, filter_fn):
+    """
+    register a Q-expression builder for an existing rule, used by filter_by_rule
+
+    filter_fn(user) returns a Q object matching exactly the objects the rule's
+    predicate permits for that user, e.g.
+
+    add_rule_filter("can_edit", lambda user: Q(author__user=user))
+    """
+    rule_filters[name] = filter_fn
+
+
+def _without_slice(queryset):
+    """a copy of a (sliced) queryset without its limits, which can be filtered"""
+    unsliced = queryset.all()
+    unsliced.query.clear_limits()
+    return unsliced
+
+
+def _slice_pks(queryset):
+    return list(queryset.values_list("pk", flat=True))
+
+
+# this is the "private" version, for mocking purposes
+def _filter_by_rule(queryset, name, user):
+    if not rules.rule_exists(name):
+        raise NonExistentRuleException(f"rule {name} does not exist")
+
+    filter_fn = rule_filters.get(name)
+    if not queryset.query.is_sliced:
+        if filter_fn is not None:
+            return queryset.filter(filter_fn(user))
+        unsliced = queryset
+    else:
+        # sliced querysets can't be filtered any further, the rows of the slice are
+        # selected by primary key from the unsliced queryset instead
+        unsliced = _without_slice(queryset)
+        if filter_fn is not None:
+            return unsliced.filter(
+                filter_fn(user), pk__in=_slice_pks(queryset)
+            )
+
+    # no filter, fall back to evaluating every row in python
+    objs = list(queryset)
+    permitted = [
+        obj
+        for obj, is_permitted in zip(objs, test_rule_many(name, user, objs))
+        if is_permitted
+    ]
+    filtered = unsliced.filter(pk__in=[obj.pk for obj in permitted])
+    # the permitted rows are already loaded, iterating the result doesn't query them
+    # again (chaining more methods onto it does)
+    # pylint: disable=protected-access
+    filtered._result_cache = permitted
+    filtered._prefetch_done = True
+    return filtered
+
+
+def filter_by_rule(queryset, name, user):
+    """
+    filters a queryset down to the objects the user passes the rule for, e.g.
+
+    editable_books = filter_by_rule(Book.objects.all(), "can_edit", request.user)
+
+    with a rule filter (see auto_rule(filter=...)) the permission check happens in
+    SQL, otherwise every row is loaded and tested against the predicate, and the
+    permitted rows are selected by primary key (a pk IN (...) list as long as the
+    permitted rows, so prefer adding a filter for rules used on large querysets)
+
+    sliced querysets (e.g. Book.objects.all()[:10]) can't be filtered any further,
+    for those the permitted rows of the slice are selected by primary key, from the
+    same queryset without the slice
+    """
+    return _filter_by_rule(queryset, name, user)
+
+
+def assert_rule_filter_matches_predicate(queryset, name, user):
+    """
+    testing utility, asserts that a rule's filter selects exactly the objects of
+    queryset that its python predicate permits for the user
+    """
+    filtered_pks = set(
+        queryset.filter(rule_filters[name](user)).values_list("pk", flat=True)
+    )
+    mismatched_pks = [
+        obj.pk
+        for obj in queryset
+        if _test_rule(name, user, obj) != (obj.pk in filtered_pks)
+    ]
+
+    assert not mismatched_pks, (
+        f"the filter and predicate of rule {name} disagree on objects with "
+        f"primary keys {mismatched_pks}"
+    )
+
+
+def auto_rule(
+    fn=None, *, cache=True, many=None, filter=None
+):  # pylint: disable=redefined-builtin
     """
     use as decorator, e.g.
 
@@ -37,10 +304,37 @@ def auto_rule(fn):
 
     add_rule("rule_name", rule_name_func)
 
+    pass cache=False, i.e. @auto_rule(cache=False), for rules that must be
+    re-evaluated every time they're tested, even inside a rule_cache scope
+
+    pass many=bulk_fn to also register a set-based implementation used by
+    test_rule_many, see add_bulk_rule
+
+    pass filter=filter_fn to also register a Q-expression builder used by
+    filter_by_rule (and by test_rule_many, absent a bulk_fn), e.g.
+
+    @auto_rule(filter=lambda user: Q(owner=user))
+    def can_edit(user, obj):
+        return obj.owner == user
+
+    see assert_rule_filter_matches_predicate for testing the two stay consistent
     """
-    pred = predicate(fn)
-    add_rule(fn.__name__, pred)
-    return pred
+
+    def register(fn):
+        pred = predicate(fn)
+        add_rule(fn.__name__, pred)
+        if not cache:
+            uncached_rules.add(fn.__name__)
+        if many is not None:
+            add_bulk_rule(fn.__name__, many)
+        if filter is not None:
+            add_rule_filter(fn.__name__, filter)
+        return pred
+
+    if fn is None:
+        return register
+
+    return register(fn)
 
 
 class patch_rules:
@@ -58,14 +352,62 @@ class patch_rules:
 
         return exec_rule
 
+    def rule_many_mocker(self, **rule_stubs):
+        def exec_rule_many(rule_name, user, objs):
+            if rule_name in rule_stubs:
+                return [rule_stubs[rule_name] for _ in objs]
+
+            return self.actual_rule_many_func(rule_name, user, objs)
+
+        return exec_rule_many
+
+    def filter_mocker(self, **rule_stubs):
+        def exec_filter(queryset, rule_name, user):
+            if rule_name in rule_stubs and queryset.query.is_sliced:
+                # like the actual filter, select the rows of the slice by pk
+                unsliced = _without_slice(queryset)
+                return (
+                    unsliced.filter(pk__in=_slice_pks(queryset))
+                    if rule_stubs[rule_name]
+                    else unsliced.none()
+                )
+            if rule_name in rule_stubs:
+                return (
+                    queryset.all()
+                    if rule_stubs[rule_name]
+                    else queryset.none()
+                )
+
+            return self.actual_filter_func(queryset, rule_name, user)
+
+        return exec_filter
+
     def __init__(self, **rule_stubs):
         self.actual_rule_func = _test_rule
-        self._patch = patch(
-            "phac_aspc.rules._test_rule", self.rule_mocker(**rule_stubs)
-        )
+        self.actual_rule_many_func = _test_rule_many
+        self.actual_filter_func = _filter_by_rule
+        self._patches = [
+            patch(
+                "phac_aspc.rules._test_rule", self.rule_mocker(**rule_stubs)
+            ),
+            patch(
+                "phac_aspc.rules._test_rule_many",
+                self.rule_many_mocker(**rule_stubs),
+            ),
+            patch(
+                "phac_aspc.rules._filter_by_rule",
+                self.filter_mocker(**rule_stubs),
+            ),
+        ]
 
     def __enter__(self):
-        return self._patch.__enter__()
+        # memoized results from before (or during) the patch would be stale
+        invalidate_rule_cache()
+        for rule_patch in self._patches[1:]:
+            rule_patch.__enter__()
+        return self._patches[0].__enter__()
 
     def __exit__(self, *excp):
-        return self._patch.__exit__(*excp)
+        invalidate_rule_cache()
+        for rule_patch in self._patches:
+            rule_patch.__exit__(*excp)
@@ -1,5 +1,12 @@
 from django.template.loader import get_template
 
+from jinja2 import pass_context
+
+from phac_aspc.django.helpers.jinja_dtl_interop_utils import (
+    JINJA_BACKEND,
+    get_engine,
+)
+
 
 def jinja_template_get_source(jinja_template):
     jinja_template_file = open(
@@ -80,3 +87,42 @@ def test_include_from_dtl_passes_context_to_the_rendered_jinja():
     )
     assert context_key not in rendered_jinja_template
     assert context_value in rendered_jinja_template
+
+
+def test_include_from_dtl_passes_jinja_local_variables():
+    included_dtl_name = (
+        "test_include_from_dtl__included_dtl_context_consuming.html"
+    )
+
+    rendered_jinja_template = (
+        get_engine(JINJA_BACKEND)
+        .from_string(
+            "{% set passed_context = 'inner value' %}"
+            + f'{{{{ include_from_dtl("{included_dtl_name}") }}}}'
+            + "{{ passed_context }}"
+        )
+        .render({"passed_context": "outer value"})
+    )
+
+    assert rendered_jinja_template == "inner valueinner value"
+
+
+def test_include_from_dtl_does_not_leak_dtl_assignments_into_jinja():
+    included_dtl_name = "test_include_from_dtl__included_dtl_assigning.html"
+
+    @pass_context
+    def get_context_var_names(context):
+        # looked up at call time, unlike template variables, which Jinja2 resolves
+        # when the template starts rendering
+        return ",".join(context.vars)
+
+    rendered_jinja_template = (
+        get_engine(JINJA_BACKEND)
+        .from_string(
+            f'{{{{ include_from_dtl("{included_dtl_name}") }}}}'
+            + "|{{ get_context_var_names() }}|"
+        )
+        .render({"get_context_var_names": get_context_var_names})
+    )
+
+    assert rendered_jinja_template == "assigned value\n||"
@@ -1,5 +1,21 @@
+import subprocess
+import sys
+from unittest.mock import patch
+
+from django.core.exceptions import ImproperlyConfigured
+from django.template import Context, Template
+from django.template.backends.jinja2 import Template as BackendTemplate
 from django.template.loader import get_template
 
+import jinja2
+import pytest
+
+from phac_aspc.django.helpers.jinja_dtl_interop_utils import (
+    JINJA_BACKEND,
+    assert_both_dtl_and_jinja_configured,
+    get_engine,
+)
+
 
 def jinja_template_get_source(jinja_template):
     jinja_template_file = open(
@@ -74,3 +90,95 @@ def test_phac_aspc_include_from_jinja_passes_context_to_the_rendered_jinja():
     )
     assert context_key not in rendered_dtl_template
     assert context_value in rendered_dtl_template
+
+
+def test_phac_aspc_include_from_jinja_uses_innermost_context_layer():
+    included_jinja_name = "test_phac_aspc_include_from_jinja__included_jinja_context_consuming.jinja2"
+
+    rendered_dtl_template = Template(
+        "{% load phac_aspc_include_from_jinja %}"
+        + '{% with passed_context="inner value" %}'
+        + f'{{% phac_aspc_include_from_jinja "{included_jinja_name}" %}}'
+        + "{% endwith %}"
+    ).render(Context({"passed_context": "outer value"}))
+
+    assert "inner value" in rendered_dtl_template
+    assert "outer value" not in rendered_dtl_template
+
+
+def test_phac_aspc_include_from_jinja_caches_templates_outside_of_debug(
+    settings,
+):
+    settings.DEBUG = False
+    included_jinja_name = (
+        "test_phac_aspc_include_from_jinja__included_jinja_basic.jinja2"
+    )
+    dtl_template = Template(
+        "{% load phac_aspc_include_from_jinja %}"
+        + f'{{% phac_aspc_include_from_jinja "{included_jinja_name}" %}}'
+    )
+
+    jinja_engine = get_engine(JINJA_BACKEND)
+    with patch.object(
+        jinja_engine, "get_template", wraps=jinja_engine.get_template
+    ) as get_template_mock:
+        for _ in range(3):
+            assert "some jinja content" in dtl_template.render(Context({}))
+
+    assert get_template_mock.call_count == 1
+
+
+def test_phac_aspc_include_from_jinja_renders_async_environment_templates():
+    async_environment = jinja2.Environment(
+        enable_async=True,
+        loader=jinja2.DictLoader({"async.jinja2": "{{ passed_context }}"}),
+    )
+    async_template = BackendTemplate(
+        async_environment.get_template("async.jinja2"),
+        get_engine(JINJA_BACKEND),
+    )
+
+    with patch(
+        "phac_aspc.django.helpers.templatetags.phac_aspc_include_from_jinja"
+        + ".get_engine_template",
+        return_value=async_template,
+    ):
+        rendered_dtl_template = Template(
+            "{% load phac_aspc_include_from_jinja %}"
+            + '{% phac_aspc_include_from_jinja "async.jinja2" %}'
+        ).render(Context({"passed_context": "async value"}))
+
+    assert rendered_dtl_template == "async value"
+
+
+def test_assert_both_dtl_and_jinja_configured(settings):
+    assert assert_both_dtl_and_jinja_configured()
+
+    settings.TEMPLATES = [
+        template_config
+        for template_config in settings.TEMPLATES
+        if template_config["BACKEND"] != JINJA_BACKEND
+    ]
+    with pytest.raises(ImproperlyConfigured):
+        assert_both_dtl_and_jinja_configured()
+
+
+def test_phac_aspc_include_from_jinja_loads_without_jinja_installed():
+    # needs a fresh interpreter, as the test run has already imported Jinja2
+    process = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys; sys.modules['jinja2'] = None; "
+            "import django; django.setup(set_prefix=False); "
+            "from django.template import Context, Engine; "
+            "library = 'phac_aspc.django.helpers.templatetags.phac_aspc_include_from_jinja'; "
+            "engine = Engine(libraries={'include_from_jinja': library}); "
+            "print(engine.from_string('{% load include_from_jinja %}ok').render(Context()))",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    assert process.stdout.strip() == "ok"
@@ -1,8 +1,21 @@
 import os
 import re
+from unittest.mock import Mock, patch
 
+from django.apps import apps
+from django.contrib.staticfiles import finders
 from django.template import Context, Template
 
+from phac_aspc.django.helpers.templatetags.phac_aspc_inline_svg import (
+    KNOWN_SVG_PATHS,
+    clear_inline_svg_cache,
+    get_inline_svg_cache_info,
+    phac_aspc_inline_svg,
+    precompile_inline_svgs,
+    precompiled_svgs,
+    warm_inline_svg_cache,
+)
+
 test_svg_name = "test_phac_aspc_inline_svg.svg"
 
 
@@ -47,3 +60,139 @@ def test_phac_aspc_inline_svg_sets_provided_attributes():
             )
             == 1
         )
+
+
+def test_phac_aspc_inline_svg_caches_renders():
+    clear_inline_svg_cache()
+
+    first_render = phac_aspc_inline_svg(test_svg_name, width="2rem")
+    assert phac_aspc_inline_svg(test_svg_name, width="2rem") == first_render
+
+    cache_info = get_inline_svg_cache_info()
+    assert cache_info["render"].hits == 1
+    assert cache_info["render"].misses == 1
+    assert cache_info["parse"].misses == 1
+
+    # attributes set on one render don't leak in to others
+    assert "2rem" not in phac_aspc_inline_svg(test_svg_name)
+    assert get_inline_svg_cache_info()["parse"].hits == 1
+
+
+def test_phac_aspc_inline_svg_invalidates_on_change_in_debug_only(
+    tmp_path, settings
+):
+    svg_path = tmp_path / "changing.svg"
+    svg_path.write_text('<svg xmlns="http://www.w3.org/2000/svg"><g /></svg>')
+    settings.STATICFILES_DIRS = [str(tmp_path)]
+    clear_inline_svg_cache()
+
+    settings.DEBUG = True
+    assert "<g" in phac_aspc_inline_svg("changing.svg")
+    svg_path.write_text(
+        '<svg xmlns="http://www.w3.org/2000/svg"><rect /></svg>'
+    )
+    os.utime(svg_path, (0, 0))
+    assert "<rect" in phac_aspc_inline_svg("changing.svg")
+
+    settings.DEBUG = False
+    assert "<rect" in phac_aspc_inline_svg("changing.svg")
+    svg_path.write_text('<svg xmlns="http://www.w3.org/2000/svg"><g /></svg>')
+    os.utime(svg_path, (1, 1))
+    assert "<rect" in phac_aspc_inline_svg("changing.svg")
+
+    clear_inline_svg_cache()
+
+
+def test_warm_inline_svg_cache():
+    clear_inline_svg_cache()
+    warm_inline_svg_cache()
+
+    cache_info = get_inline_svg_cache_info()
+    assert cache_info["render"].currsize == len(KNOWN_SVG_PATHS)
+
+    phac_aspc_inline_svg(KNOWN_SVG_PATHS[0])
+    assert get_inline_svg_cache_info()["render"].hits == 1
+
+
+def test_precompile_inline_svgs(tmp_path, settings):
+    (tmp_path / "verbose.svg").write_text(
+        """<svg xmlns="http://www.w3.org/2000/svg"
+    xmlns:inkscape="http://www.inkscape.org/namespaces/inkscape"
+    inkscape:version="1.0">
+  <!-- a comment -->
+  <metadata><rdf>...</rdf></metadata>
+  <title>A   title</title>
+  <inkscape:grid />
+  <g inkscape:label="layer">
+    <text><tspan>a</tspan> <tspan>b</tspan></text>
+  </g>
+</svg>
+"""
+    )
+    settings.STATICFILES_DIRS = [str(tmp_path)]
+    settings.DEBUG = False
+    clear_inline_svg_cache()
+
+    precompile_inline_svgs()
+    assert str(tmp_path / "verbose.svg") in precompiled_svgs
+    assert {finders.find(path) for path in KNOWN_SVG_PATHS} <= set(
+        precompiled_svgs
+    )
+
+    # served minified, from memory
+    assert phac_aspc_inline_svg("verbose.svg") == (
+        '<svg xmlns="http://www.w3.org/2000/svg"><title>A title</title>'
+        + "<g><text><tspan>a</tspan> <tspan>b</tspan></text></g></svg>"
+    )
+
+    clear_inline_svg_cache()
+
+
+def test_precompile_inline_svgs_skips_unreadable_svgs(tmp_path, settings):
+    (tmp_path / "malformed.svg").write_text("<svg><g></svg>")
+    (tmp_path / "valid.svg").write_text(
+        '<svg xmlns="http://www.w3.org/2000/svg"><g /></svg>'
+    )
+    settings.STATICFILES_DIRS = [str(tmp_path)]
+    clear_inline_svg_cache()
+
+    with patch(
+        "phac_aspc.django.helpers.templatetags.phac_aspc_inline_svg.logger"
+    ) as logger_mock:
+        precompile_inline_svgs()
+    assert str(tmp_path / "valid.svg") in precompiled_svgs
+    assert str(tmp_path / "malformed.svg") not in precompiled_svgs
+    logger_mock.warning.assert_called_once_with(
+        'Not precompiling SVG "%s"', "malformed.svg", exc_info=True
+    )
+
+    # storages without file paths are skipped as well
+    remote_storage = Mock()
+    remote_storage.path.side_effect = NotImplementedError
+    remote_finder = Mock()
+    remote_finder.list.return_value = [("remote.svg", remote_storage)]
+    clear_inline_svg_cache()
+    with patch.object(finders, "get_finders", return_value=[remote_finder]):
+        precompile_inline_svgs()
+    assert not precompiled_svgs
+
+    clear_inline_svg_cache()
+
+
+def test_ready_only_precompiles_bundled_svgs_unless_opted_in(settings):
+    settings.DEBUG = False
+    helpers_config = apps.get_app_config("helpers")
+
+    with patch(
+        "phac_aspc.django.helpers.templatetags.phac_aspc_inline_svg"
+        + ".precompile_inline_svgs"
+    ) as precompile_mock:
+        helpers_config.ready()
+        precompile_mock.assert_called_once_with(KNOWN_SVG_PATHS)
+
+        precompile_mock.reset_mock()
+        settings.PHAC_ASPC_INLINE_SVG_PRECOMPILE_ALL = True
+        helpers_config.ready()
+        precompile_mock.assert_called_once_with()
+
+    clear_inline_svg_cache()
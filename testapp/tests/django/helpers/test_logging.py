@@ -1,7 +1,9 @@
 import json
 import logging
 import os
+import threading
 from copy import deepcopy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from unittest.mock import Mock
 
 from django.http import HttpResponse
@@ -13,6 +15,11 @@ import responses
 import structlog
 from testfixtures import LogCapture
 
+from phac_aspc.django.helpers.logging import azure_insights_handlers
+from phac_aspc.django.helpers.logging.azure_insights_handlers import (
+    BatchedAzureInsightsHandler,
+    parse_connection_string,
+)
 from phac_aspc.django.helpers.logging.configure_logging import (
     PHAC_HELPER_CONSOLE_HANDLER_KEY,
     PHAC_HELPER_JSON_FORMATTER_KEY,
@@ -268,6 +275,47 @@ def test_configured_additional_handlers_are_used():
     custom_filter_func.assert_called_once()
 
 
+def test_configured_formatters_render_each_record_once_across_handlers():
+    shared_formatter_key = "shared_formatter"
+    json_renderer = structlog.processors.JSONRenderer()
+    shared_formatter_func = Mock(side_effect=json_renderer)
+
+    configure_uniform_std_lib_and_structlog_logging(
+        console_handler_formatter_key=shared_formatter_key,
+        additional_handler_configs={
+            f"{handler_number}_handler_sharing_formatter": {
+                "class": "logging.StreamHandler",
+                "level": "DEBUG",
+                "stream": (
+                    # pylint: disable=consider-using-with
+                    open(os.devnull, "w", encoding="UTF-8")
+                ),
+                "formatter": shared_formatter_key,
+            }
+            for handler_number in ("first", "second")
+        },
+        additional_formatter_functions={
+            shared_formatter_key: shared_formatter_func
+        },
+    )
+
+    logger = logging.getLogger(
+        "logger_test_configured_formatters_render_each_record_once"
+    )
+    structlogger = structlog.getLogger(
+        "structlogger_test_configured_formatters_render_each_record_once"
+    )
+
+    number_of_records = 10
+    for record_number in range(number_of_records):
+        logger.error("std lib record %s", record_number)
+        structlogger.error("structlog record", record_number=record_number)
+
+    # three handlers share the formatter, but each record is rendered once
+    assert len(logging.root.handlers) == 3
+    assert shared_formatter_func.call_count == number_of_records * 2
+
+
 def test_configured_json_logging_consistent_between_standard_logger_and_structlogger():
     configure_uniform_std_lib_and_structlog_logging(
         console_handler_formatter_key=PHAC_HELPER_JSON_FORMATTER_KEY
@@ -308,6 +356,36 @@ def test_configured_json_logging_consistent_between_standard_logger_and_structlo
     ) == log_to_filtered_dict(captured_formatted_logs[1])
 
 
+@pytest.mark.parametrize("add_exception_types", [False, True])
+def test_configured_logging_only_adds_exception_types_when_asked(
+    add_exception_types,
+):
+    configure_uniform_std_lib_and_structlog_logging(
+        console_handler_formatter_key=PHAC_HELPER_JSON_FORMATTER_KEY,
+        add_exception_types=add_exception_types,
+    )
+    json_console_handler = get_configured_logging_handler_by_name(
+        PHAC_HELPER_CONSOLE_HANDLER_KEY
+    )
+
+    (
+        logger,
+        structlogger,
+        captured_formatted_logs,
+    ) = formatted_log_capturing_logger_factory(json_console_handler)
+
+    try:
+        raise KeyError("missing")
+    except KeyError:
+        logger.exception("something went wrong")
+        structlogger.exception("something went wrong")
+
+    assert [
+        json.loads(formatted_log).get("exception_type")
+        for formatted_log in captured_formatted_logs
+    ] == (["KeyError"] * 2 if add_exception_types else [None] * 2)
+
+
 def test_add_fields_to_all_logs_for_current_request(
     vanilla_user_client, settings
 ):
@@ -541,3 +619,311 @@ def test_json_post_handler_emits_no_error_logs_in_fail_silent_mode(
 
     # no other logs were seen by the root logger
     assert len(capture_all_log_records.records) == 1
+
+
+@pytest.fixture()
+def azure_ingestion_stand_in():
+    """Local HTTP server standing in for the Azure Insights ingestion endpoint. Records
+    the envelope batches POSTed to it. Responses can be held back, by clearing
+    `server.release`, and the response status set via `server.response_status`
+    """
+
+    class IngestionRequestHandler(BaseHTTPRequestHandler):
+        def do_POST(self):  # pylint: disable=invalid-name
+            body = self.rfile.read(int(self.headers["Content-Length"]))
+            self.server.received_batches.append((self.path, json.loads(body)))
+            self.server.received.set()
+            self.server.release.wait(3)
+
+            self.send_response(self.server.response_status)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), IngestionRequestHandler)
+    server.received_batches = []
+    server.received = threading.Event()
+    server.release = threading.Event()
+    server.release.set()
+    server.response_status = 200
+    server.connection_string = (
+        "InstrumentationKey=00000000-0000-0000-0000-000000000000;"
+        f"IngestionEndpoint=http://127.0.0.1:{server.server_port}/"
+    )
+
+    server_thread = threading.Thread(
+        target=server.serve_forever,
+        kwargs={"poll_interval": 0.05},
+        daemon=True,
+    )
+    server_thread.start()
+    yield server
+    server.release.set()
+    server.shutdown()
+    server.server_close()
+
+
+def test_parse_connection_string():
+    assert parse_connection_string(
+        "InstrumentationKey=abc;IngestionEndpoint=https://example.com/;Other=x"
+    ) == ("abc", "https://example.com")
+
+    assert parse_connection_string("instrumentationkey=abc") == (
+        "abc",
+        "https://dc.services.visualstudio.com",
+    )
+
+    with pytest.raises(ValueError):
+        parse_connection_string("IngestionEndpoint=https://example.com/")
+
+
+@pytest.mark.timeout(5)
+def test_batched_azure_handler_exports_event_dicts_in_batches(
+    azure_ingestion_stand_in,
+):
+    configure_uniform_std_lib_and_structlog_logging(
+        console_handler_formatter_key=PHAC_HELPER_JSON_FORMATTER_KEY
+    )
+
+    azure_handler = BatchedAzureInsightsHandler(
+        connection_string=azure_ingestion_stand_in.connection_string,
+        export_interval=60,
+    )
+
+    (
+        logger,
+        structlogger,
+        _captured_formatted_logs,
+    ) = formatted_log_capturing_logger_factory(azure_handler)
+
+    logger.warning("from the standard library")
+    structlogger.error("from structlog", some_key="some value")
+
+    azure_handler.flush()
+
+    # both records were sent in a single batch, without waiting on the export interval
+    assert len(azure_ingestion_stand_in.received_batches) == 1
+    path, batch = azure_ingestion_stand_in.received_batches[0]
+    assert path == "/v2.1/track"
+    assert len(batch) == 2
+
+    std_lib_envelope, structlog_envelope = batch
+    for envelope in batch:
+        assert envelope["iKey"] == "00000000-0000-0000-0000-000000000000"
+        assert envelope["data"]["baseType"] == "MessageData"
+
+    std_lib_data = std_lib_envelope["data"]["baseData"]
+    assert std_lib_data["message"] == "from the standard library"
+    assert std_lib_data["severityLevel"] == 2
+    assert std_lib_data["properties"]["logger"] == logger.name
+    assert std_lib_data["properties"]["level"] == "warning"
+    assert "_record" not in std_lib_data["properties"]
+
+    structlog_data = structlog_envelope["data"]["baseData"]
+    assert structlog_data["message"] == "from structlog"
+    assert structlog_data["severityLevel"] == 3
+    assert structlog_data["properties"]["some_key"] == "some value"
+    assert structlog_data["properties"]["logger"] == structlogger.name
+
+    assert azure_handler.get_metrics() == {
+        "queue_depth": 0,
+        "sent": 2,
+        "dropped": 0,
+        "failed": 0,
+    }
+
+    azure_handler.close()
+
+
+@pytest.mark.timeout(5)
+def test_batched_azure_handler_exports_exceptions(azure_ingestion_stand_in):
+    azure_handler = BatchedAzureInsightsHandler(
+        connection_string=azure_ingestion_stand_in.connection_string,
+    )
+
+    (
+        logger,
+        _structlogger,
+        _captured_formatted_logs,
+    ) = formatted_log_capturing_logger_factory(azure_handler)
+
+    try:
+        raise KeyError("missing")
+    except KeyError:
+        logger.exception("something went wrong")
+
+    azure_handler.flush()
+
+    _path, [envelope] = azure_ingestion_stand_in.received_batches[0]
+    assert envelope["data"]["baseType"] == "ExceptionData"
+    [exception] = envelope["data"]["baseData"]["exceptions"]
+    assert exception["typeName"] == "KeyError"
+    assert exception["message"] == "something went wrong"
+    assert "raise KeyError" in exception["stack"]
+
+    azure_handler.close()
+
+
+@pytest.mark.timeout(5)
+def test_batched_azure_handler_exports_structlog_exception_types(
+    azure_ingestion_stand_in,
+):
+    configure_uniform_std_lib_and_structlog_logging(
+        console_handler_formatter_key=PHAC_HELPER_JSON_FORMATTER_KEY,
+        add_exception_types=True,
+    )
+
+    azure_handler = BatchedAzureInsightsHandler(
+        connection_string=azure_ingestion_stand_in.connection_string,
+    )
+
+    (
+        _logger,
+        structlogger,
+        _captured_formatted_logs,
+    ) = formatted_log_capturing_logger_factory(azure_handler)
+
+    try:
+        raise KeyError("missing")
+    except KeyError:
+        structlogger.exception("something went wrong")
+
+    structlogger.error("caught earlier", exc_info=ValueError("invalid"))
+
+    azure_handler.flush()
+
+    _path, envelopes = azure_ingestion_stand_in.received_batches[0]
+    assert [
+        envelope["data"]["baseData"]["exceptions"][0]["typeName"]
+        for envelope in envelopes
+    ] == ["KeyError", "ValueError"]
+    assert (
+        "exception_type" not in envelopes[0]["data"]["baseData"]["properties"]
+    )
+
+    azure_handler.close()
+
+
+@pytest.mark.timeout(10)
+def test_batched_azure_handler_restarts_worker_in_forked_child(
+    azure_ingestion_stand_in,
+):
+    azure_handler = BatchedAzureInsightsHandler(
+        connection_string=azure_ingestion_stand_in.connection_string,
+    )
+
+    (
+        logger,
+        _structlogger,
+        _captured_formatted_logs,
+    ) = formatted_log_capturing_logger_factory(azure_handler)
+
+    # reset in forked children by a single, module level, callback
+    assert (
+        azure_handler
+        in azure_insights_handlers._handlers  # pylint: disable=protected-access
+    )
+
+    # the parent logs, and starts its worker, before forking
+    logger.info("from the parent")
+    azure_handler.flush()
+
+    pid = os.fork()
+    if pid == 0:  # pragma: no cover, runs in the child
+        exit_code = 1
+        try:
+            logger.info("from the child")
+            azure_handler.flush()
+            if azure_handler.get_metrics() == {
+                "queue_depth": 0,
+                "sent": 1,
+                "dropped": 0,
+                "failed": 0,
+            }:
+                exit_code = 0
+        finally:
+            os._exit(exit_code)  # pylint: disable=protected-access
+
+    _pid, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+
+    assert [
+        batch[0]["data"]["baseData"]["message"]
+        for _path, batch in azure_ingestion_stand_in.received_batches
+    ] == ["from the parent", "from the child"]
+
+    azure_handler.close()
+
+
+@pytest.mark.timeout(5)
+def test_batched_azure_handler_drops_and_counts_when_queue_is_full(
+    azure_ingestion_stand_in,
+):
+    azure_handler = BatchedAzureInsightsHandler(
+        connection_string=azure_ingestion_stand_in.connection_string,
+        max_batch_size=1,
+        max_queue_size=2,
+    )
+
+    (
+        logger,
+        _structlogger,
+        _captured_formatted_logs,
+    ) = formatted_log_capturing_logger_factory(azure_handler)
+
+    # hold the first export open, so the worker stops draining the queue
+    azure_ingestion_stand_in.release.clear()
+    logger.info("first")
+    assert azure_ingestion_stand_in.received.wait(3)
+
+    for message in ("second", "third", "fourth"):
+        logger.info(message)
+
+    assert azure_handler.get_metrics() == {
+        "queue_depth": 2,
+        "sent": 0,
+        "dropped": 1,
+        "failed": 0,
+    }
+
+    azure_ingestion_stand_in.release.set()
+    azure_handler.flush()
+
+    assert [
+        batch[0]["data"]["baseData"]["message"]
+        for _path, batch in azure_ingestion_stand_in.received_batches
+    ] == ["first", "second", "third"]
+    assert azure_handler.get_metrics()["sent"] == 3
+
+    azure_handler.close()
+
+
+@pytest.mark.timeout(5)
+def test_batched_azure_handler_counts_failed_exports(
+    azure_ingestion_stand_in, capture_all_log_records
+):
+    azure_ingestion_stand_in.response_status = 500
+
+    azure_handler = BatchedAzureInsightsHandler(
+        connection_string=azure_ingestion_stand_in.connection_string,
+        fail_silent=True,
+    )
+
+    (
+        logger,
+        _structlogger,
+        _captured_formatted_logs,
+    ) = formatted_log_capturing_logger_factory(azure_handler)
+
+    logger.error("Original error")
+    azure_handler.flush()
+
+    assert len(azure_ingestion_stand_in.received_batches) == 1
+    assert azure_handler.get_metrics()["failed"] == 1
+    assert azure_handler.get_metrics()["sent"] == 0
+
+    # no other logs were seen by the root logger
+    assert len(capture_all_log_records.records) == 1
+
+    azure_handler.close()
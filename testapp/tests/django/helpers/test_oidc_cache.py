@@ -0,0 +1,246 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from joserfc import jwt
+from joserfc.errors import InvalidKeyIdError
+from joserfc.jwk import RSAKey
+
+from phac_aspc.django.helpers.auth.oidc_cache import (
+    CachedMetadataOAuth,
+    OIDCDocumentCache,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture()
+def identity_provider_stand_in():
+    """Local HTTP server standing in for an OpenID Connect identity provider. Serves
+    the JSON documents in `server.documents`, by path, and records the paths
+    requested. Responses can be held back by clearing `server.release`
+    """
+
+    class IdentityProviderRequestHandler(BaseHTTPRequestHandler):
+        def do_GET(self):  # pylint: disable=invalid-name
+            self.server.requested_paths.append(self.path)
+            self.server.release.wait(3)
+
+            body = json.dumps(self.server.documents[self.path]).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(
+        ("127.0.0.1", 0), IdentityProviderRequestHandler
+    )
+    server.base_url = f"http://127.0.0.1:{server.server_port}"
+    server.metadata_url = f"{server.base_url}/.well-known/openid-configuration"
+    server.requested_paths = []
+    server.release = threading.Event()
+    server.release.set()
+    server.signing_key = RSAKey.generate_key(2048, parameters={"kid": "one"})
+    server.documents = {
+        "/.well-known/openid-configuration": {
+            "issuer": server.base_url,
+            "authorization_endpoint": f"{server.base_url}/authorize",
+            "token_endpoint": f"{server.base_url}/token",
+            "jwks_uri": f"{server.base_url}/keys",
+            "id_token_signing_alg_values_supported": ["RS256"],
+        },
+        "/keys": {"keys": [server.signing_key.as_dict(private=False)]},
+    }
+
+    def rotate_signing_key(kid):
+        server.signing_key = RSAKey.generate_key(2048, parameters={"kid": kid})
+        server.documents["/keys"] = {
+            "keys": [server.signing_key.as_dict(private=False)]
+        }
+
+    server.rotate_signing_key = rotate_signing_key
+
+    server_thread = threading.Thread(
+        target=server.serve_forever,
+        kwargs={"poll_interval": 0.05},
+        daemon=True,
+    )
+    server_thread.start()
+    yield server
+    server.release.set()
+    server.shutdown()
+    server.server_close()
+
+
+def wait_for(condition, timeout=3):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_oidc_document_cache_serves_documents_until_they_expire(
+    identity_provider_stand_in,
+):
+    clock = FakeClock()
+    oidc_cache = OIDCDocumentCache(ttl=60, refresh_margin=0, clock=clock)
+    url = identity_provider_stand_in.metadata_url
+
+    assert oidc_cache.get(url)["jwks_uri"].endswith("/keys")
+    clock.now += 59
+    oidc_cache.get(url)
+    assert len(identity_provider_stand_in.requested_paths) == 1
+
+    clock.now += 1
+    oidc_cache.get(url)
+    assert len(identity_provider_stand_in.requested_paths) == 2
+
+
+@pytest.mark.timeout(5)
+def test_oidc_document_cache_refreshes_in_the_background_before_expiry(
+    identity_provider_stand_in,
+):
+    clock = FakeClock()
+    oidc_cache = OIDCDocumentCache(ttl=60, refresh_margin=10, clock=clock)
+    url = identity_provider_stand_in.metadata_url
+
+    stale_document = oidc_cache.get(url)
+    identity_provider_stand_in.documents[
+        "/.well-known/openid-configuration"
+    ] = {"issuer": "rotated"}
+    identity_provider_stand_in.release.clear()
+    clock.now += 55
+
+    # served from cache, without waiting on the held back refresh
+    assert oidc_cache.get(url) == stale_document
+    assert oidc_cache.get(url) == stale_document
+
+    identity_provider_stand_in.release.set()
+    assert wait_for(lambda: oidc_cache.get(url) == {"issuer": "rotated"})
+    assert len(identity_provider_stand_in.requested_paths) == 2
+
+
+@pytest.mark.timeout(5)
+def test_oidc_document_cache_misses_wait_on_a_single_fetch(
+    identity_provider_stand_in,
+):
+    oidc_cache = OIDCDocumentCache()
+    url = identity_provider_stand_in.metadata_url
+    identity_provider_stand_in.release.clear()
+
+    documents = []
+    threads = [
+        threading.Thread(target=lambda: documents.append(oidc_cache.get(url)))
+        for _ in range(10)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.2)
+    identity_provider_stand_in.release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(documents) == 10
+    assert len(identity_provider_stand_in.requested_paths) == 1
+
+
+@pytest.mark.timeout(5)
+def test_oidc_document_cache_refetch_is_guarded_against_stampedes(
+    identity_provider_stand_in,
+):
+    clock = FakeClock()
+    oidc_cache = OIDCDocumentCache(refetch_interval=30, clock=clock)
+    url = f"{identity_provider_stand_in.base_url}/keys"
+
+    oidc_cache.get(url)
+    # fetched too recently to be worth fetching again
+    oidc_cache.refetch(url)
+    assert len(identity_provider_stand_in.requested_paths) == 1
+
+    clock.now += 30
+    threads = [
+        threading.Thread(target=oidc_cache.refetch, args=(url,))
+        for _ in range(10)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(identity_provider_stand_in.requested_paths) == 2
+
+
+def test_oidc_document_cache_is_shared_through_the_django_cache(
+    identity_provider_stand_in,
+):
+    url = identity_provider_stand_in.metadata_url
+
+    first_worker_cache = OIDCDocumentCache(cache_alias="default")
+    second_worker_cache = OIDCDocumentCache(cache_alias="default")
+
+    assert first_worker_cache.get(url) == second_worker_cache.get(url)
+    assert len(identity_provider_stand_in.requested_paths) == 1
+
+
+def test_cached_metadata_client_refetches_keys_on_kid_miss(
+    identity_provider_stand_in, settings
+):
+    settings.OIDC_CACHE_REFETCH_INTERVAL = 0
+
+    oauth = CachedMetadataOAuth()
+    oauth.register(
+        "stand_in",
+        client_id="client-id",
+        client_secret="client-secret",
+        server_metadata_url=identity_provider_stand_in.metadata_url,
+    )
+    client = oauth.create_client("stand_in")
+
+    def parse_id_token():
+        now = int(time.time())
+        id_token = jwt.encode(
+            {
+                "alg": "RS256",
+                "kid": identity_provider_stand_in.signing_key.kid,
+            },
+            {
+                "iss": identity_provider_stand_in.base_url,
+                "aud": "client-id",
+                "sub": "user",
+                "nonce": "nonce",
+                "iat": now,
+                "exp": now + 300,
+            },
+            identity_provider_stand_in.signing_key,
+        )
+        return client.parse_id_token({"id_token": id_token}, nonce="nonce")
+
+    assert parse_id_token()["sub"] == "user"
+    assert parse_id_token()["sub"] == "user"
+    assert identity_provider_stand_in.requested_paths == [
+        "/.well-known/openid-configuration",
+        "/keys",
+    ]
+
+    identity_provider_stand_in.rotate_signing_key("two")
+    assert parse_id_token()["sub"] == "user"
+    assert identity_provider_stand_in.requested_paths[2:] == ["/keys"]
+
+    # with the keys fetched too recently to be refetched, unknown kids are rejected
+    settings.OIDC_CACHE_REFETCH_INTERVAL = 30
+    assert parse_id_token()["sub"] == "user"
+    identity_provider_stand_in.rotate_signing_key("three")
+    with pytest.raises(InvalidKeyIdError):
+        parse_id_token()
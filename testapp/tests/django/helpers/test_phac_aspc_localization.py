@@ -2,6 +2,20 @@
 Localization templatetags unit tests
 """
 
+import threading
+from datetime import date
+from pathlib import Path
+from unittest.mock import patch
+
+from django.template import Context, Template, loader
+from django.utils.translation import override
+
+from phac_aspc.django.helpers.locale.code import get_language_code
+from phac_aspc.django.helpers.locale.formatting import (
+    format_currency,
+    format_date,
+    format_number,
+)
 from phac_aspc.django.helpers.locale.language import locale_lang
 from phac_aspc.django.helpers.templatetags.phac_aspc_localization import (
     get_language,
@@ -17,3 +31,98 @@ def test_get_language():
 
     with locale_lang("en-ca"):
         assert get_language() == "en-ca"
+
+
+def test_get_language_code():
+    assert get_language_code("fr-CA") == "fr"
+    assert get_language_code("en-ca") == "en"
+    # not in LANGUAGES
+    assert get_language_code("fr-be") == "fr"
+    assert get_language_code("xx-yy") == "xx"
+
+    with override("fr-ca"):
+        assert get_language_code() == "fr"
+
+
+def test_locale_explicit_formatting():
+    assert (
+        format_number(1234567.891, "en-ca", decimal_places=2) == "1,234,567.89"
+    )
+    assert format_number(1234567.891, "fr-ca", decimal_places=2) == (
+        "1\xa0234\xa0567,89"
+    )
+    assert format_number(1234567, "en-ca", grouping=False) == "1234567"
+
+    assert format_currency(-1234.5, "en-ca") == "-$1,234.50"
+    assert format_currency(1234.5, "fr-ca") == "1\xa0234,50\xa0$"
+
+    with override("en-ca"):
+        assert format_date(date(2024, 1, 5), "fr-ca") == "5 janvier 2024"
+        assert (
+            format_date(date(2024, 1, 5), date_format="Y-m-d") == "2024-01-05"
+        )
+
+
+def test_locale_explicit_formatting_is_thread_safe():
+    expected = {"en-ca": "1,234.50", "fr-ca": "1\xa0234,50"}
+    barrier = threading.Barrier(8)
+    mismatches = []
+
+    def format_repeatedly(lang):
+        barrier.wait()
+        for _ in range(200):
+            formatted = format_number(1234.5, lang, decimal_places=2)
+            if formatted != expected[lang]:
+                mismatches.append((lang, formatted))
+
+    threads = [
+        threading.Thread(target=format_repeatedly, args=(lang,))
+        for lang in ["en-ca", "fr-ca"] * 4
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not mismatches
+
+
+def test_use_string_caches_context_free_strings_per_language(settings):
+    settings.DEBUG = False
+    string_template = Template(
+        "{% load phac_aspc_localization %}{% use_string 'error_retry' %}"
+    )
+
+    with patch(
+        "django.template.loader.get_template", wraps=loader.get_template
+    ) as get_template_mock:
+        with override("en-ca"):
+            english = string_template.render(Context({}))
+            assert string_template.render(Context({})) == english
+        with override("fr-ca"):
+            french = string_template.render(Context({}))
+            assert string_template.render(Context({})) == french
+
+    assert english.strip() == "Try again"
+    assert french.strip() != english.strip()
+    assert get_template_mock.call_count == 2
+
+
+def test_use_string_renders_other_strings_with_context(settings):
+    settings.DEBUG = False
+    settings.TEMPLATES = [
+        {
+            **settings.TEMPLATES[0],
+            "DIRS": [
+                str(Path(__file__).parent / "templates" / "use_string"),
+                *settings.TEMPLATES[0]["DIRS"],
+            ],
+        },
+        *settings.TEMPLATES[1:],
+    ]
+    string_template = Template(
+        "{% load phac_aspc_localization %}{% use_string 'error_retry' %}"
+    )
+
+    assert "first" in string_template.render(Context({"value": "first"}))
+    assert "second" in string_template.render(Context({"value": "second"}))
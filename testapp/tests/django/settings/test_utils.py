@@ -3,13 +3,16 @@
 import os
 import subprocess
 from copy import deepcopy
+from types import ModuleType
 from unittest.mock import patch
 
 from django.core.checks.registry import registry
 
+import environ
 import pytest
 
 from phac_aspc.django.settings.utils import (
+    ResolvedEnvConfig,
     configure_apps,
     configure_authentication_backends,
     configure_middleware,
@@ -286,6 +289,27 @@ def test_get_env(tmp_path, freeze_environ):
         assert env(env_var) is True
 
 
+def test_get_env_reads_each_env_file_once(tmp_path, freeze_environ):
+    env_path = os.path.join(tmp_path, ".env")
+    with open(env_path, "w", encoding="UTF-8") as env_file:
+        env_file.write("ENV_VAR_READ_ONCE=true")
+
+    with (
+        patch(
+            f"{find_env_file.__module__}.{find_env_file.__name__}",
+            return_value=env_path,
+        ),
+        patch(
+            "environ.Env.read_env", side_effect=environ.Env.read_env
+        ) as read_env,
+    ):
+        get_env(prefix="ENV_VAR_", READ_ONCE=(bool, False))
+        env = get_env(prefix="ENV_VAR_", READ_ONCE=(bool, False))
+
+    assert env("ENV_VAR_READ_ONCE") is True
+    assert read_env.call_count == 1
+
+
 def test_get_env_value(tmp_path, settings, freeze_environ):
     prefix = "ENV_VAR_"
 
@@ -334,3 +358,57 @@ def test_global_from_env(tmp_path, settings, freeze_environ):
         GLOBAL_FROM_SETTINGS == not_default
     )  # pylint: disable=undefined-variable
     assert GLOBAL_FROM_DEFAULT == default  # pylint: disable=undefined-variable
+
+
+def test_resolved_env_config(settings, freeze_environ):
+    prefix = "RESOLVED_ENV_VAR_"
+    os.environ[f"{prefix}FROM_ENV"] = "from env"
+
+    config = ResolvedEnvConfig(
+        get_env(
+            prefix=prefix,
+            FROM_ENV=(str, "default"),
+            FROM_SETTINGS=(str, "default"),
+        ),
+        prefix=prefix,
+    )
+
+    assert config.get("FROM_ENV") == "from env"
+    assert config.get("FROM_SETTINGS") == "default"
+
+    # frozen, until reloaded
+    os.environ[f"{prefix}FROM_ENV"] = "changed"
+    assert config.get("FROM_ENV") == "from env"
+    config.reload()
+    assert config.get("FROM_ENV") == "changed"
+
+    # changing a prefixed setting reloads the config
+    setattr(settings, f"{prefix}FROM_SETTINGS", "from settings")
+    assert config.get("FROM_SETTINGS") == "from settings"
+
+
+def test_global_from_env_into_another_module(freeze_environ):
+    module = ModuleType("settings_module")
+
+    global_from_env(
+        prefix="",
+        module=module,
+        GLOBAL_INTO_MODULE=(str, "default"),
+    )
+
+    assert module.GLOBAL_INTO_MODULE == "default"
+    assert "GLOBAL_INTO_MODULE" not in globals()
+
+
+def test_warn_and_remove_warning_id_defaults_to_calling_function():
+    def configure_something():
+        return warn_and_remove(["a"], ["a"])
+
+    configure_something()
+
+    assert "configure_something" in [
+        warning.id
+        for check in registry.get_checks()
+        if check.__name__ == "phac_aspc_conf_warning"
+        for warning in check(None)
+    ]
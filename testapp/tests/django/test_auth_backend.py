@@ -0,0 +1,201 @@
+from django.contrib.auth.models import Group, Permission
+from django.db.models import QuerySet
+
+import pytest
+
+from phac_aspc.django.helpers.auth.backend import PhacAspcOAuthBackend
+from phac_aspc.django.helpers.auth.user_cache import get_user_cache
+from testapp.models import User
+
+
+def test_authenticate_creates_new_users():
+    user = PhacAspcOAuthBackend().authenticate(
+        None, user_info={"oid": "new-oid", "email": "new@example.com"}
+    )
+
+    assert user.pk is not None
+    assert User.objects.get(username="new-oid").email == "new@example.com"
+
+
+def test_authenticate_costs_returning_users_one_query(
+    django_assert_num_queries,
+):
+    User.objects.create(username="oid", email="user@example.com")
+    backend = PhacAspcOAuthBackend()
+
+    with django_assert_num_queries(1):
+        user = backend.authenticate(
+            None, user_info={"oid": "oid", "email": "user@example.com"}
+        )
+    assert user.username == "oid"
+
+    with django_assert_num_queries(1):
+        # missing claims don't clear stored values
+        backend.authenticate(None, user_info={"oid": "oid", "email": ""})
+    assert User.objects.get(username="oid").email == "user@example.com"
+
+
+def test_authenticate_only_updates_changed_claims(django_assert_num_queries):
+    User.objects.create(
+        username="oid", email="old@example.com", first_name="A"
+    )
+
+    class NameSyncingBackend(PhacAspcOAuthBackend):
+        claim_fields = {"email": "email", "name": "first_name"}
+
+    with django_assert_num_queries(2) as captured:
+        NameSyncingBackend().authenticate(
+            None,
+            user_info={"oid": "oid", "email": "new@example.com", "name": "A"},
+        )
+
+    update_sql = captured.captured_queries[1]["sql"]
+    assert update_sql.startswith("UPDATE")
+    assert "first_name" not in update_sql
+
+    user = User.objects.get(username="oid")
+    assert (user.email, user.first_name) == ("new@example.com", "A")
+
+
+def test_authenticate_calls_sync_user_overrides():
+    synced = []
+
+    class CustomBackend(PhacAspcOAuthBackend):
+        def _sync_user(self, user, user_info, force=False):
+            synced.append((user_info["oid"], force))
+            user.first_name = user_info["name"]
+            user.save()
+
+    backend = CustomBackend()
+    backend.authenticate(None, user_info={"oid": "oid", "name": "A"})
+    backend.authenticate(None, user_info={"oid": "oid", "name": "B"})
+
+    assert synced == [("oid", True), ("oid", False)]
+    assert User.objects.get(username="oid").first_name == "B"
+
+
+def test_authenticate_syncs_groups_from_the_group_claim(
+    django_assert_num_queries,
+):
+    readers, writers = Group.objects.bulk_create(
+        [Group(name="readers"), Group(name="writers")]
+    )
+
+    class GroupSyncingBackend(PhacAspcOAuthBackend):
+        group_claim = "roles"
+
+    backend = GroupSyncingBackend()
+    user = backend.authenticate(
+        None, user_info={"oid": "oid", "roles": ["readers", "unknown"]}
+    )
+    assert list(user.groups.all()) == [readers]
+
+    with django_assert_num_queries(3):
+        backend.authenticate(
+            None, user_info={"oid": "oid", "roles": ["readers"]}
+        )
+
+    backend.authenticate(None, user_info={"oid": "oid", "roles": ["writers"]})
+    assert list(user.groups.all()) == [writers]
+
+    # logins without the claim leave the groups alone
+    with django_assert_num_queries(1):
+        backend.authenticate(None, user_info={"oid": "oid"})
+    assert list(user.groups.all()) == [writers]
+
+
+def test_authenticate_recovers_from_concurrent_first_logins(monkeypatch):
+    User.objects.create(username="oid", email="user@example.com")
+
+    original_get = QuerySet.get
+    lookups = []
+
+    def get_as_if_another_login_had_not_created_the_user_yet(
+        self, *args, **kwargs
+    ):
+        lookups.append(kwargs)
+        if len(lookups) == 1:
+            raise User.DoesNotExist()
+        return original_get(self, *args, **kwargs)
+
+    monkeypatch.setattr(
+        QuerySet, "get", get_as_if_another_login_had_not_created_the_user_yet
+    )
+
+    user = PhacAspcOAuthBackend().authenticate(
+        None, user_info={"oid": "oid", "email": "user@example.com"}
+    )
+
+    assert len(lookups) == 2
+    assert user == User.objects.filter(username="oid").first()
+
+
+@pytest.fixture()
+def user_cache_enabled(settings):
+    settings.PHAC_ASPC_OAUTH_USER_CACHE = True
+    get_user_cache().clear()
+    yield
+    get_user_cache().clear()
+
+
+def test_get_user_is_cached_until_the_user_changes(
+    user_cache_enabled, django_assert_num_queries
+):
+    # pylint: disable=redefined-outer-name,unused-argument
+    user = User.objects.create(username="oid", email="old@example.com")
+    backend = PhacAspcOAuthBackend()
+
+    with django_assert_num_queries(1):
+        assert backend.get_user(user.pk) == user
+        assert backend.get_user(user.pk) == user
+
+    user.email = "new@example.com"
+    user.save()
+    with django_assert_num_queries(1):
+        assert backend.get_user(user.pk).email == "new@example.com"
+        assert backend.get_user(user.pk).email == "new@example.com"
+
+    pk = user.pk
+    user.delete()
+    assert backend.get_user(pk) is None
+
+
+def test_get_user_is_not_cached_after_group_or_permission_changes(
+    user_cache_enabled, django_assert_num_queries
+):
+    # pylint: disable=redefined-outer-name,unused-argument
+    user = User.objects.create(username="oid")
+    group = Group.objects.create(name="readers")
+    permission = Permission.objects.first()
+    backend = PhacAspcOAuthBackend()
+
+    for change_memberships in [
+        lambda: user.groups.add(group),
+        lambda: group.user_set.remove(user),
+        lambda: group.user_set.add(user),
+        lambda: group.user_set.clear(),
+        lambda: user.user_permissions.add(permission),
+        lambda: user.user_permissions.clear(),
+        lambda: permission.user_set.set([user]),
+    ]:
+        backend.get_user(user.pk)
+        change_memberships()
+        with django_assert_num_queries(1):
+            backend.get_user(user.pk)
+
+    # other users stay cached
+    other_user = User.objects.create(username="other-oid")
+    backend.get_user(other_user.pk)
+    group.user_set.add(user)
+    group.user_set.clear()
+    with django_assert_num_queries(0):
+        backend.get_user(other_user.pk)
+
+
+def test_get_user_is_not_cached_by_default(django_assert_num_queries):
+    user = User.objects.create(username="oid")
+    backend = PhacAspcOAuthBackend()
+
+    with django_assert_num_queries(2):
+        backend.get_user(user.pk)
+        backend.get_user(user.pk)
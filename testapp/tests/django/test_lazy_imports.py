@@ -0,0 +1,97 @@
+import subprocess
+import sys
+from importlib import import_module
+
+import pytest
+
+from phac_aspc.django.helpers import templatetags
+
+
+@pytest.mark.parametrize(
+    "module, lazy_dependency",
+    [
+        ("phac_aspc.django.excel", "openpyxl"),
+        ("phac_aspc.django.helpers.auth.views", "authlib"),
+    ],
+)
+def test_module_does_not_import_dependency_until_used(module, lazy_dependency):
+    # needs a fresh interpreter, as the test run has already imported everything
+    process = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, django; django.setup(set_prefix=False); "
+            f"sys.modules.pop({lazy_dependency!r}, None); import {module}; "
+            f"print({lazy_dependency!r} in sys.modules)",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    assert process.stdout.strip() == "False"
+
+
+def test_templatetags_package_does_not_import_tag_libraries():
+    # without django.setup(), so nothing has imported the package beforehand
+    process = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys; import phac_aspc.django.helpers.templatetags; "
+            "prefix = 'phac_aspc.django.helpers.templatetags.'; "
+            "print(sorted(m for m in sys.modules if m.startswith(prefix) "
+            "or m.split('.')[0] in ('openpyxl', 'authlib', 'jinja2')))",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    assert process.stdout.strip() == "[]"
+
+
+def test_setup_only_imports_the_inline_svg_tag_library():
+    # ready() warms the inline SVG cache, but must not import other tag libraries
+    process = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, django; django.setup(set_prefix=False); "
+            "prefix = 'phac_aspc.django.helpers.templatetags.'; "
+            "print(sorted(m for m in sys.modules if m.startswith(prefix)))",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    assert process.stdout.strip() == str(
+        ["phac_aspc.django.helpers.templatetags.phac_aspc_inline_svg"]
+    )
+
+
+def test_templatetags_are_loaded_on_first_access():
+    phac_aspc_wet = import_module(f"{templatetags.__name__}.phac_aspc_wet")
+    phac_aspc_inline_svg = import_module(
+        f"{templatetags.__name__}.phac_aspc_inline_svg"
+    )
+
+    assert templatetags.phac_aspc_wet_css is phac_aspc_wet.phac_aspc_wet_css
+    assert "phac_aspc_wet_css" in dir(templatetags)
+
+    # the tags, rather than the modules of the same name
+    assert (
+        templatetags.phac_aspc_inline_svg
+        is phac_aspc_inline_svg.phac_aspc_inline_svg
+    )
+    phac_aspc_include_from_jinja = import_module(
+        f"{templatetags.__name__}.phac_aspc_include_from_jinja"
+    )
+    assert (
+        templatetags.phac_aspc_include_from_jinja
+        is phac_aspc_include_from_jinja.phac_aspc_include_from_jinja
+    )
+
+    with pytest.raises(AttributeError):
+        templatetags.not_a_tag  # pylint: disable=pointless-statement
@@ -3,14 +3,31 @@
 Localization templatetags unit tests
 """
 
+import base64
+import gzip
+import hashlib
+import os
+import tarfile
+from io import BytesIO, StringIO
+from unittest.mock import patch
+
 from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.management import CommandError, call_command
+from django.template import loader
 from django.test import override_settings
+from django.urls import reverse
+from django.utils import translation
 
 import pytest
 
+from phac_aspc.django.helpers.storage import WetManifestStaticFilesStorage
 from phac_aspc.django.helpers.templatetags.phac_aspc_wet import (
+    WET_ASSETS,
     jsdelivr,
     phac_aspc_wet_css,
+    phac_aspc_wet_resource_hints,
     phac_aspc_wet_scripts,
     phac_aspc_wet_session_timeout_dialog,
 )
@@ -125,6 +142,86 @@ def test_phac_aspc_wet_session_timeout_dialog():
     assert "&quot;sessionalive&quot;: 60000" in html
 
 
+@override_settings(
+    SESSION_COOKIE_AGE=60,
+    SESSION_SAVE_EVERY_REQUEST=False,
+    SESSION_REFRESH_THRESHOLD=30,
+    ROOT_URLCONF="phac_aspc.django.helpers.urls",
+    TEMPLATES=[
+        {
+            "BACKEND": "django.template.backends.django.DjangoTemplates",
+            "APP_DIRS": True,
+        },
+    ],
+)
+def test_phac_aspc_wet_session_timeout_dialog_with_refresh_threshold():
+    """Test the dialog allows for sessions only being extended periodically"""
+    html = phac_aspc_wet_session_timeout_dialog(
+        {"request": Request(User(True))}, "test_logout"
+    )
+    assert "&quot;sessionalive&quot;: 30000" in html
+    assert "&quot;inactivity&quot;: 24000.0" in html
+
+
+@override_settings(
+    SESSION_COOKIE_AGE=60,
+    SESSION_SAVE_EVERY_REQUEST=False,
+    SESSION_REFRESH_THRESHOLD=60,
+    ROOT_URLCONF="phac_aspc.django.helpers.urls",
+    TEMPLATES=[
+        {
+            "BACKEND": "django.template.backends.django.DjangoTemplates",
+            "APP_DIRS": True,
+        },
+    ],
+)
+def test_phac_aspc_wet_session_timeout_dialog_rejects_refresh_threshold_past_cookie_age():
+    """Test the dialog isn't configured to time out immediately"""
+    with pytest.raises(ImproperlyConfigured):
+        phac_aspc_wet_session_timeout_dialog(
+            {"request": Request(User(True))}, "test_logout"
+        )
+
+
+@override_settings(
+    DEBUG=False,
+    SESSION_COOKIE_AGE=60,
+    ROOT_URLCONF="phac_aspc.django.helpers.urls",
+    TEMPLATES=[
+        {
+            "BACKEND": "django.template.backends.django.DjangoTemplates",
+            "APP_DIRS": True,
+        },
+    ],
+)
+def test_phac_aspc_wet_session_timeout_dialog_is_cached():
+    """Test the dialog's template and config are only built once per logout url
+    and language"""
+    context = {"request": Request(User(True))}
+    module = "phac_aspc.django.helpers.templatetags.phac_aspc_wet"
+    with (
+        patch(f"{module}.urls.reverse", wraps=reverse) as reverse_mock,
+        patch(
+            f"{module}.loader.get_template", wraps=loader.get_template
+        ) as get_template_mock,
+    ):
+        with translation.override("en-ca"):
+            html = phac_aspc_wet_session_timeout_dialog(context, "test_logout")
+            for _ in range(3):
+                assert (
+                    phac_aspc_wet_session_timeout_dialog(
+                        context, "test_logout"
+                    )
+                    == html
+                )
+        assert reverse_mock.call_count == 2
+        with translation.override("fr-ca"):
+            phac_aspc_wet_session_timeout_dialog(context, "test_logout")
+        phac_aspc_wet_session_timeout_dialog(context, "other_logout")
+        assert reverse_mock.call_count == 6
+        assert get_template_mock.call_count == 1
+
+
 @override_settings(
     SESSION_COOKIE_AGE=60,
     ROOT_URLCONF=__name__,
@@ -141,3 +238,199 @@ def test_phac_aspc_wet_session_timeout_dialog_errors():
         phac_aspc_wet_session_timeout_dialog(
             {"request": Request(User(True))}, "test_logout"
         )
+
+
+@override_settings(WET_VERSION="a", THEME_VERSION="b")
+def test_phac_aspc_wet_tags_are_precomputed():
+    """Test the tags are only built once per versions and flags"""
+    with patch(
+        "phac_aspc.django.helpers.templatetags.phac_aspc_wet.jsdelivr",
+        wraps=jsdelivr,
+    ) as jsdelivr_mock:
+        for _ in range(3):
+            phac_aspc_wet_css()
+            phac_aspc_wet_scripts()
+        assert jsdelivr_mock.call_count == 4
+
+        with override_settings(WET_VERSION="c"):
+            assert "wet-boew-dist@c" in phac_aspc_wet_css()
+        assert jsdelivr_mock.call_count == 6
+
+
+@override_settings(
+    WET_VERSION="a",
+    THEME_VERSION="b",
+    WET_INTEGRITY={
+        "https://cdn.jsdelivr.net/gh/wet-boew/themes-dist@b/GCWeb/css/theme.min.css": "sha384-css",
+        "https://cdn.jsdelivr.net/gh/wet-boew/wet-boew-dist@a/wet-boew/js/wet-boew.min.js": "sha384-js",
+    },
+)
+def test_phac_aspc_wet_integrity_and_resource_hints():
+    """Test integrity attributes and preconnect/preload hints"""
+    assert phac_aspc_wet_css().startswith(
+        '<link rel="stylesheet" '
+        'href="https://cdn.jsdelivr.net/gh/wet-boew/themes-dist@b/'
+        'GCWeb/css/theme.min.css" integrity="sha384-css" crossorigin="anonymous">'
+    )
+    assert (
+        '<script src="https://cdn.jsdelivr.net/gh/wet-boew/wet-boew-dist@a/'
+        'wet-boew/js/wet-boew.min.js" integrity="sha384-js" '
+        'crossorigin="anonymous"></script>'
+    ) in phac_aspc_wet_scripts()
+
+    assert phac_aspc_wet_resource_hints() == (
+        '<link rel="preconnect" href="https://cdn.jsdelivr.net">'
+        '<link rel="preconnect" href="https://ajax.googleapis.com">'
+        '<link rel="preload" href="https://cdn.jsdelivr.net/gh/wet-boew/'
+        'themes-dist@b/GCWeb/css/theme.min.css" as="style" '
+        'integrity="sha384-css" crossorigin="anonymous">'
+        '<link rel="preload" href="https://ajax.googleapis.com/ajax/libs/'
+        'jquery/2.2.4/jquery.min.js" as="script" '
+        'integrity="sha384-rY/jv8mMhqDabXSo+UCggqKtdmBfd3qC2/KvyTDNQ6PcUJXaxK1tMepoQda4g5vB" '
+        'crossorigin="anonymous">'
+        '<link rel="preload" href="https://cdn.jsdelivr.net/gh/wet-boew/'
+        'wet-boew-dist@a/wet-boew/js/wet-boew.min.js" as="script" '
+        'integrity="sha384-js" crossorigin="anonymous">'
+        '<link rel="preload" href="https://cdn.jsdelivr.net/gh/wet-boew/'
+        'themes-dist@b/GCWeb/js/theme.min.js" as="script">'
+    )
+
+    hints = phac_aspc_wet_resource_hints(base_only=True, include_jquery=False)
+    assert "googleapis" not in hints
+    assert "theme.min.css" not in hints
+
+
+@override_settings(WET_VERSION="a", THEME_VERSION="b")
+def test_phac_aspc_wet_sri_command(tmp_path):
+    """Test SRI hashes are computed from local copies of the assets"""
+    for _pkg, asset in WET_ASSETS:
+        asset_path = tmp_path.joinpath(*asset.split("/"))
+        asset_path.parent.mkdir(parents=True, exist_ok=True)
+        asset_path.write_text(asset)
+
+    stdout = StringIO()
+    call_command("phac_aspc_wet_sri", str(tmp_path), stdout=stdout)
+
+    expected_hash = base64.b64encode(
+        hashlib.sha384(b"wet-boew/js/wet-boew.min.js").digest()
+    ).decode()
+    assert stdout.getvalue().startswith("WET_INTEGRITY = {")
+    assert (
+        "'https://cdn.jsdelivr.net/gh/wet-boew/wet-boew-dist@a/wet-boew/js/"
+        f"wet-boew.min.js': 'sha384-{expected_hash}'"
+    ) in stdout.getvalue()
+
+    tmp_path.joinpath("GCWeb", "js", "theme.min.js").unlink()
+    with pytest.raises(CommandError):
+        call_command("phac_aspc_wet_sri", str(tmp_path), stdout=StringIO())
+
+
+def write_wet_archive(archive_path, top_level_directory, files):
+    with tarfile.open(archive_path, "w:gz") as archive:
+        for name, content in files.items():
+            member = tarfile.TarInfo(f"{top_level_directory}/{name}")
+            member.size = len(content)
+            archive.addfile(member, BytesIO(content))
+
+
+@override_settings(WET_VERSION="a", THEME_VERSION="b")
+def test_phac_aspc_wet_vendor_command(tmp_path):
+    """Test the WET assets are extracted from local archives"""
+    write_wet_archive(
+        tmp_path / "wet-boew-dist.tar.gz",
+        "wet-boew-dist-a",
+        {
+            "wet-boew/js/wet-boew.min.js": b"wet",
+            "README.md": b"not an asset",
+            "../escaped/wet-boew/js/escaped.js": b"escaped",
+        },
+    )
+    write_wet_archive(
+        tmp_path / "themes-dist.tar.gz",
+        "themes-dist-b",
+        {"GCWeb/css/theme.min.css": b"gcweb"},
+    )
+
+    destination = tmp_path / "static"
+    call_command(
+        "phac_aspc_wet_vendor",
+        str(destination),
+        str(tmp_path / "wet-boew-dist.tar.gz"),
+        str(tmp_path / "themes-dist.tar.gz"),
+        stdout=StringIO(),
+    )
+
+    wet_root = destination / "phac_aspc_helpers" / "wet"
+    assert sorted(
+        str(path.relative_to(wet_root))
+        for path in wet_root.rglob("*")
+        if path.is_file()
+    ) == [
+        "themes-dist-b/GCWeb/css/theme.min.css",
+        "wet-boew-dist-a/wet-boew/js/wet-boew.min.js",
+    ]
+
+    (tmp_path / "not_an_archive").write_text("")
+    with pytest.raises(CommandError):
+        call_command(
+            "phac_aspc_wet_vendor",
+            str(destination),
+            str(tmp_path / "not_an_archive"),
+            stdout=StringIO(),
+        )
+
+
+@override_settings(
+    WET_VERSION="a",
+    THEME_VERSION="b",
+    WET_SELF_HOSTED=True,
+    STATIC_URL="/static/",
+)
+def test_phac_aspc_wet_self_hosted():
+    """Test the WET tags resolve to static URLs when self hosted"""
+    assert (
+        jsdelivr("wet-boew", "wet-boew/js/wet-boew.min.js")
+        == "/static/phac_aspc_helpers/wet/wet-boew-dist-a/wet-boew/js/wet-boew.min.js"
+    )
+
+    scripts = phac_aspc_wet_scripts()
+    assert "cdn.jsdelivr.net" not in scripts
+    assert "googleapis" not in scripts
+    assert (
+        '<script src="/static/phac_aspc_helpers/wet/wet-boew-dist-a/wet-boew/js/'
+        'jquery/2.2.4/jquery.min.js"></script>'
+    ) in scripts
+
+    # no other origins to connect to
+    assert "preconnect" not in phac_aspc_wet_resource_hints()
+
+
+@override_settings(STATIC_URL="/static/")
+def test_wet_manifest_static_files_storage(tmp_path):
+    """Test hashed WET assets get pre-compressed variants"""
+    source = FileSystemStorage(location=tmp_path / "source")
+    wet_asset = (
+        "phac_aspc_helpers/wet/wet-boew-dist-a/wet-boew/js/wet-boew.min.js"
+    )
+    other_asset = "other/app.js"
+    for name in [wet_asset, other_asset]:
+        source.save(name, ContentFile(b"console.log('test');" * 100))
+
+    storage = WetManifestStaticFilesStorage(location=tmp_path / "static")
+    for name in [wet_asset, other_asset]:
+        with source.open(name) as source_file:
+            storage.save(name, source_file)
+
+    list(
+        storage.post_process(
+            {name: (source, name) for name in [wet_asset, other_asset]}
+        )
+    )
+
+    hashed_wet_asset = storage.path(storage.stored_name(wet_asset))
+    assert hashed_wet_asset != storage.path(wet_asset)
+    with gzip.open(f"{hashed_wet_asset}.gz") as compressed_file:
+        assert compressed_file.read() == b"console.log('test');" * 100
+
+    hashed_other_asset = storage.path(storage.stored_name(other_asset))
+    assert not os.path.exists(f"{hashed_other_asset}.gz")
@@ -0,0 +1,125 @@
+"""
+Session keep-alive unit tests
+"""
+
+from datetime import timedelta
+
+from django.contrib.sessions.models import Session
+from django.core.exceptions import ImproperlyConfigured
+from django.urls import reverse
+from django.utils import timezone
+
+import pytest
+
+from phac_aspc.django.helpers.session import (
+    REFRESHED_COOKIE_NAME,
+    get_session_refresh_threshold,
+)
+
+
+@pytest.fixture
+def keep_alive_settings(settings):
+    settings.ROOT_URLCONF = "phac_aspc.django.helpers.urls"
+    settings.SESSION_SAVE_EVERY_REQUEST = False
+    settings.SESSION_EXPIRE_AT_BROWSER_CLOSE = True
+    settings.SESSION_REFRESH_THRESHOLD = 60
+    settings.MIDDLEWARE = [
+        *settings.MIDDLEWARE[:2],
+        "phac_aspc.django.helpers.session.SessionKeepAliveMiddleware",
+        *settings.MIDDLEWARE[2:],
+    ]
+    return settings
+
+
+def set_session_expiry(client, expire_date):
+    Session.objects.filter(session_key=client.session.session_key).update(
+        expire_date=expire_date
+    )
+
+
+def get_session_expiry(client):
+    return Session.objects.get(
+        session_key=client.session.session_key
+    ).expire_date
+
+
+def test_keep_alive_skips_recently_refreshed_sessions(
+    keep_alive_settings, vanilla_user_client
+):
+    soon = timezone.now() + timedelta(seconds=10)
+    set_session_expiry(vanilla_user_client, soon)
+
+    # no record of a refresh, so the expiry is extended
+    response = vanilla_user_client.get("/")
+    assert get_session_expiry(vanilla_user_client) > soon
+    assert REFRESHED_COOKIE_NAME in response.cookies
+
+    # refreshed within the threshold, so left alone
+    set_session_expiry(vanilla_user_client, soon)
+    response = vanilla_user_client.get("/")
+    assert get_session_expiry(vanilla_user_client) == soon
+    assert REFRESHED_COOKIE_NAME not in response.cookies
+
+    # refreshed too long ago
+    vanilla_user_client.cookies[REFRESHED_COOKIE_NAME] = "0"
+    vanilla_user_client.get("/")
+    assert get_session_expiry(vanilla_user_client) > soon
+
+
+def test_keep_alive_only_touches_the_expiry(
+    keep_alive_settings, vanilla_user_client
+):
+    session = Session.objects.get(
+        session_key=vanilla_user_client.session.session_key
+    )
+
+    vanilla_user_client.get("/")
+
+    refreshed_session = Session.objects.get(session_key=session.session_key)
+    assert refreshed_session.session_data == session.session_data
+    assert refreshed_session.expire_date > session.expire_date
+
+
+def test_session_view_always_refreshes(
+    keep_alive_settings, vanilla_user_client
+):
+    session_url = reverse("phac_aspc_helpers_session")
+    vanilla_user_client.get("/")
+
+    soon = timezone.now() + timedelta(seconds=10)
+    set_session_expiry(vanilla_user_client, soon)
+
+    response = vanilla_user_client.put(session_url)
+    assert response.content == b"true"
+    assert get_session_expiry(vanilla_user_client) > soon
+    assert REFRESHED_COOKIE_NAME in response.cookies
+
+
+def test_keep_alive_is_inactive_when_saving_every_request(
+    keep_alive_settings, vanilla_user_client
+):
+    keep_alive_settings.SESSION_SAVE_EVERY_REQUEST = True
+
+    response = vanilla_user_client.get("/")
+    assert REFRESHED_COOKIE_NAME not in response.cookies
+
+
+def test_keep_alive_skips_anonymous_sessions(keep_alive_settings, client):
+    response = client.get("/")
+    assert REFRESHED_COOKIE_NAME not in response.cookies
+
+
+def test_refresh_threshold_must_be_less_than_the_cookie_age(
+    keep_alive_settings,
+):
+    keep_alive_settings.SESSION_COOKIE_AGE = 120
+    assert get_session_refresh_threshold() == 60
+
+    for refresh_threshold in (120, 180):
+        keep_alive_settings.SESSION_REFRESH_THRESHOLD = refresh_threshold
+        with pytest.raises(ImproperlyConfigured):
+            get_session_refresh_threshold()
+
+    # unused when saving every request
+    keep_alive_settings.SESSION_SAVE_EVERY_REQUEST = True
+    assert get_session_refresh_threshold() == 0
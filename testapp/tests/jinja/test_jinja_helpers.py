@@ -1,4 +1,24 @@
-from phac_aspc.jinja.standard_helpers import cls_str
+from types import ModuleType
+from unittest.mock import patch
+
+from django.conf.urls.i18n import i18n_patterns
+from django.http import HttpResponse
+from django.templatetags.static import static
+from django.urls import NoReverseMatch, path, reverse, set_script_prefix
+from django.utils.translation import override
+
+import pytest
+
+from phac_aspc.jinja.registry import JinjaRegistry
+from phac_aspc.jinja.standard_helpers import (
+    StaticUrlFoldingExtension,
+    cached_reverse,
+    cls_str,
+    convert_url_other_lang,
+    get_lang_code,
+    get_other_lang,
+    get_other_lang_code,
+)
 
 
 def test_cls_str():
@@ -16,3 +36,146 @@ def test_cls_str():
 
     assert cls_str("class1" and False, True and "class2") == " class2 "
     assert cls_str("class1" if False else "class2") == " class2 "
+
+
+def folding_test_view(request):
+    return HttpResponse()
+
+
+folding_test_urls = ModuleType("folding_test_urls")
+folding_test_urls.urlpatterns = [
+    path("plain/", folding_test_view, name="plain"),
+    path("item/<int:pk>/", folding_test_view, name="item"),
+    *i18n_patterns(
+        path("translated/", folding_test_view, name="translated"),
+    ),
+]
+
+
+def test_static_url_folding_extension(settings):
+    settings.ROOT_URLCONF = folding_test_urls
+    settings.LANGUAGES = [("en-ca", "English"), ("fr-ca", "French")]
+    settings.STATIC_URL = "/static/"
+
+    registry = JinjaRegistry()
+    registry.add_global("static", static)
+    env = registry.get_environment(extensions=[StaticUrlFoldingExtension])
+
+    def compiled_source(template_source):
+        return env.compile(template_source, raw=True)
+
+    # literal calls are resolved at compile time
+    source = compiled_source(
+        "{{ static('app/logo.svg') }} {{ url('plain') }} {{ url('translated') }}"
+    )
+    assert "/static/app/logo.svg" in source
+    # without the script prefix, which is prepended on render
+    assert "'plain/'" in source
+    # ... unless they depend on the active language
+    assert "/en-ca/translated/" not in source
+
+    # attribute access and dynamic arguments are left alone
+    source = compiled_source(
+        "{{ obj.url('plain') }} {{ url(name) }} {{ url('item', args=[1]) }}"
+    )
+    assert "/plain/" not in source
+
+    template = env.from_string(
+        "{{ url('item', args=[pk]) }} {{ url('translated') }}"
+    )
+    with patch(
+        "phac_aspc.jinja.standard_helpers.reverse", side_effect=reverse
+    ) as reverse_mock:
+        with override("en-ca"):
+            assert template.render(pk=1) == "/item/1/ /en-ca/translated/"
+            assert template.render(pk=1) == "/item/1/ /en-ca/translated/"
+        with override("fr-ca"):
+            assert template.render(pk=1) == "/item/1/ /fr-ca/translated/"
+        # the reverse cache is keyed on language
+        assert reverse_mock.call_count == 4
+
+    # the script prefix comes from the render, not the compile
+    template = env.from_string("{{ url('plain') }}|{{ url('plain')|length }}")
+    try:
+        set_script_prefix("/mounted/")
+        assert template.render() == "/mounted/plain/|15"
+    finally:
+        set_script_prefix("/")
+    assert template.render() == "/plain/|7"
+
+    # missing URLs still raise on render, rather than on compile
+    with pytest.raises(NoReverseMatch):
+        env.from_string("{{ url('missing') }}").render()
+
+
+def test_reverse_cache_is_cleared_with_urlconf(settings):
+    settings.ROOT_URLCONF = folding_test_urls
+    assert cached_reverse("plain") == "/plain/"
+
+    other_urls = ModuleType("other_urls")
+    other_urls.urlpatterns = [
+        path("other/", folding_test_view, name="plain"),
+    ]
+    settings.ROOT_URLCONF = other_urls
+    assert cached_reverse("plain") == "/other/"
+
+
+def test_convert_url_other_lang(settings):
+    settings.ROOT_URLCONF = folding_test_urls
+    settings.LANGUAGES = [("en-ca", "English"), ("fr-ca", "French")]
+
+    with override("en-ca"):
+        assert (
+            convert_url_other_lang("/en-ca/translated/")
+            == "/fr-ca/translated/"
+        )
+        # the query is kept as is, apart from a translated next parameter
+        assert (
+            convert_url_other_lang(
+                "/en-ca/translated/?q=en-ca&next=/en-ca/translated/"
+            )
+            == "/fr-ca/translated/?q=en-ca&next=/fr-ca/translated/"
+        )
+        assert (
+            convert_url_other_lang(
+                "/en-ca/translated/?next=%2Fen-ca%2Ftranslated%2F"
+            )
+            == "/fr-ca/translated/?next=/fr-ca/translated/"
+        )
+        # URLs outside i18n_patterns, or that don't resolve, are left alone
+        assert (
+            convert_url_other_lang("/plain/?next=/plain/")
+            == "/plain/?next=/plain/"
+        )
+        assert convert_url_other_lang("/en-ca/missing/") == "/en-ca/missing/"
+
+    with override("fr-ca"):
+        assert (
+            convert_url_other_lang("/fr-ca/translated/?page=2")
+            == "/en-ca/translated/?page=2"
+        )
+
+
+def test_language_helpers():
+    with override("en-CA"):
+        assert get_lang_code() == "en-ca"
+        assert get_other_lang_code() == "fr-ca"
+        assert get_other_lang() == "Français"
+
+    with override("fr-ca"):
+        assert get_lang_code() == "fr-ca"
+        assert get_other_lang_code() == "en-ca"
+        assert get_other_lang() == "English"
+
+
+def test_language_helpers_follow_languages_setting(settings):
+    settings.LANGUAGES = [("en", "English"), ("es", "Spanish")]
+
+    with override("en"):
+        assert get_other_lang_code() == "es"
+        assert get_other_lang() == "Español"
+
+    with override("es"):
+        assert get_lang_code() == "es"
+        assert get_other_lang_code() == "en"
+        assert get_other_lang() == "English"
@@ -1,4 +1,6 @@
-from jinja2 import Environment, pass_context
+from unittest.mock import patch
+
+from jinja2 import DictLoader, Environment, FileSystemLoader, pass_context
 
 from phac_aspc.jinja.registry import JinjaRegistry
 
@@ -46,3 +48,78 @@ def test_view(client):
 
     assert "en-ca" in response.content.decode("utf-8")
     assert "fr-ca" in response.content.decode("utf-8")
+
+
+def test_registry_reuses_environments():
+    registry = JinjaRegistry()
+    loader = DictLoader({"template.jinja2": "{{ value }}"})
+
+    env = registry.get_environment(loader=loader)
+    assert registry.get_environment(loader=loader) is env
+    assert registry.get_environment(loader=loader, autoescape=True) is not env
+
+    # options are compared by value, e.g. equal lists of extensions
+    env_with_extensions = registry.get_environment(
+        loader=loader, extensions=["jinja2.ext.do"]
+    )
+    assert (
+        registry.get_environment(loader=loader, extensions=["jinja2.ext.do"])
+        is env_with_extensions
+    )
+
+    # environments built for new loaders on every call don't pile up
+    for _ in range(registry.max_environments * 2):
+        registry.get_environment(loader=DictLoader({}))
+    assert len(registry._environments) == registry.max_environments
+    # the least recently used ones are dropped first
+    assert registry.get_environment(loader=loader) is not env
+
+    # registering new helpers invalidates previously built environments
+    registry.add_global("value", "test")
+    new_env = registry.get_environment(loader=loader)
+    assert new_env is not env
+    assert new_env.get_template("template.jinja2").render() == "test"
+
+
+def test_registry_auto_reload_follows_debug(settings):
+    settings.DEBUG = False
+    assert not JinjaRegistry().get_environment().auto_reload
+
+    settings.DEBUG = True
+    assert JinjaRegistry().get_environment().auto_reload
+    assert not JinjaRegistry().get_environment(auto_reload=False).auto_reload
+
+
+def test_registry_bytecode_cache_skips_compilation_on_startup(tmp_path):
+    """Loads a large template tree from a fresh registry, as a new worker would,
+    and checks that none of it is compiled from source a second time"""
+    template_dir = tmp_path / "templates"
+    template_names = []
+    for section in range(20):
+        (template_dir / f"section_{section}").mkdir(parents=True)
+        for page in range(25):
+            template_name = f"section_{section}/page_{page}.jinja2"
+            (template_dir / template_name).write_text(
+                "{% for item in items %}<li>{{ item|upper }}</li>{% endfor %}"
+                + f"<p>{section} {page}</p>"
+            )
+            template_names.append(template_name)
+
+    def start_worker():
+        registry = JinjaRegistry()
+        registry.use_filesystem_bytecode_cache(str(tmp_path / "cache"))
+        env = registry.get_environment(
+            loader=FileSystemLoader(str(template_dir))
+        )
+        with patch.object(
+            Environment,
+            "compile",
+            autospec=True,
+            side_effect=Environment.compile,
+        ) as compile_mock:
+            for template_name in template_names:
+                env.get_template(template_name)
+        return compile_mock.call_count
+
+    assert start_worker() == len(template_names)
+    assert start_worker() == 0
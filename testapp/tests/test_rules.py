@@ -1,11 +1,27 @@
+from django.db.models import Q, QuerySet
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+import pytest
+
 from phac_aspc.rules import (
+    RuleCacheMiddleware,
     add_rule,
+    add_rule_filter,
+    assert_rule_filter_matches_predicate,
     auto_rule,
+    filter_by_rule,
+    get_rule_cache_stats,
+    invalidate_rule_cache,
     patch_rules,
+    rule_cache,
 )
 from phac_aspc.rules import (
     test_rule as func_test_rule,  # must be imported in form that doesn't start with test_; otherwise pytest will try to run it as a test
 )
+from phac_aspc.rules import test_rule_many as func_test_rule_many
+from testapp.model_factories import AuthorFactory, BookFactory
+from testapp.models import Book
 
 
 def test_rules():
@@ -32,3 +48,235 @@ def test_rules():
     # rules are returned to normal after patch_rules
     assert not func_test_rule("has_bar_access")
     assert func_test_rule("has_foo_access")
+
+
+def test_rule_cache():
+    calls = []
+
+    @auto_rule
+    def can_edit_cached(user, obj):
+        calls.append((user, obj))
+        return isinstance(obj, int) and obj % 2 == 0
+
+    # no memoization outside of a rule_cache scope
+    func_test_rule("can_edit_cached", "user", 1)
+    func_test_rule("can_edit_cached", "user", 1)
+    assert len(calls) == 2
+    assert get_rule_cache_stats() is None
+
+    calls.clear()
+    with rule_cache():
+        for _ in range(5):
+            for obj in range(10):
+                assert func_test_rule("can_edit_cached", "user", obj) == (
+                    obj % 2 == 0
+                )
+
+        # predicate ran once per distinct (rule, user, obj)
+        assert len(calls) == 10
+        assert get_rule_cache_stats() == {"hits": 40, "misses": 10}
+
+        invalidate_rule_cache("can_edit_cached")
+        func_test_rule("can_edit_cached", "user", 1)
+        assert len(calls) == 11
+
+        # unhashable arguments are evaluated, not memoized
+        func_test_rule("can_edit_cached", "user", [])
+        func_test_rule("can_edit_cached", "user", [])
+        assert len(calls) == 13
+
+    assert get_rule_cache_stats() is None
+
+
+def test_rule_cache_opt_out():
+    calls = []
+
+    @auto_rule(cache=False)
+    def is_rate_limited(user, obj):
+        calls.append((user, obj))
+        return False
+
+    with rule_cache():
+        func_test_rule("is_rate_limited", "user")
+        func_test_rule("is_rate_limited", "user")
+
+    assert len(calls) == 2
+
+
+def test_rule_cache_with_patch_rules():
+    @auto_rule
+    def can_view_cached(user, obj):
+        return True
+
+    with rule_cache():
+        assert func_test_rule("can_view_cached", "user")
+
+        with patch_rules(can_view_cached=False):
+            assert not func_test_rule("can_view_cached", "user")
+
+        assert func_test_rule("can_view_cached", "user")
+
+
+def test_rule_cache_middleware():
+    calls = []
+
+    @auto_rule
+    def can_access_view(user, obj):
+        calls.append((user, obj))
+        return True
+
+    def view(request):
+        for _ in range(3):
+            func_test_rule("can_access_view", "user")
+        return HttpResponse(str(get_rule_cache_stats()))
+
+    middleware = RuleCacheMiddleware(view)
+    request = RequestFactory().get("/")
+
+    for _ in range(2):
+        response = middleware(request)
+        assert response.content == b"{'hits': 2, 'misses': 1}"
+
+    # the cache is scoped to each request
+    assert len(calls) == 2
+
+
+@pytest.mark.django_db
+def test_rule_many(django_assert_num_queries):
+    author = AuthorFactory()
+    other_author = AuthorFactory()
+    books = [
+        BookFactory(author=book_author)
+        for book_author in [author, other_author, author, other_author]
+    ]
+    expected = [True, False, True, False]
+
+    def is_book_author_many(user, objs):
+        return Book.objects.filter(
+            pk__in=[obj.pk for obj in objs], author=user
+        )
+
+    @auto_rule(many=is_book_author_many)
+    def is_book_author(user, obj):
+        return obj.author_id == user.pk
+
+    @auto_rule
+    def is_book_author_without_bulk(user, obj):
+        return Book.objects.filter(pk=obj.pk, author=user).exists()
+
+    # one query for the set-based implementation, instead of one per object
+    with django_assert_num_queries(1):
+        assert func_test_rule_many("is_book_author", author, books) == expected
+
+    # rules without a set-based implementation fall back to the predicate
+    with django_assert_num_queries(len(books)):
+        assert (
+            func_test_rule_many("is_book_author_without_bulk", author, books)
+            == expected
+        )
+
+    # bulk results are memoized for subsequent single-object tests
+    with rule_cache():
+        func_test_rule_many("is_book_author", author, books)
+        with django_assert_num_queries(0):
+            assert [
+                func_test_rule("is_book_author", author, book)
+                for book in books
+            ] == expected
+        assert get_rule_cache_stats() == {"hits": 4, "misses": 0}
+
+    with patch_rules(is_book_author=True):
+        assert func_test_rule_many("is_book_author", author, books) == [
+            True
+        ] * len(books)
+
+
+@pytest.mark.django_db
+def test_filter_by_rule(django_assert_num_queries):
+    author = AuthorFactory()
+    other_author = AuthorFactory()
+    books = [
+        BookFactory(author=book_author)
+        for book_author in [author, other_author, author, other_author]
+    ]
+    authored_pks = {books[0].pk, books[2].pk}
+
+    @auto_rule(filter=lambda user: Q(author=user))
+    def is_book_author_filtered(user, obj):
+        return obj.author_id == user.pk
+
+    @auto_rule
+    def is_book_author_unfiltered(user, obj):
+        return obj.author_id == user.pk
+
+    # the filter and the python predicate agree on every book
+    for user in [author, other_author]:
+        assert_rule_filter_matches_predicate(
+            Book.objects.all(), "is_book_author_filtered", user
+        )
+
+    # a filter that disagrees with its predicate is caught
+    add_rule("is_book_author_inconsistent", is_book_author_filtered)
+    add_rule_filter("is_book_author_inconsistent", lambda user: Q(pk=None))
+    with pytest.raises(AssertionError):
+        assert_rule_filter_matches_predicate(
+            Book.objects.all(), "is_book_author_inconsistent", author
+        )
+
+    # rules with a filter are resolved in SQL, no rows are loaded up front
+    with django_assert_num_queries(0):
+        filtered = filter_by_rule(
+            Book.objects.all(), "is_book_author_filtered", author
+        )
+    with django_assert_num_queries(1):
+        assert {book.pk for book in filtered} == authored_pks
+
+    # rules without a filter fall back to testing each row in python, the result
+    # is built from the rows already loaded
+    with django_assert_num_queries(1):
+        filtered = filter_by_rule(
+            Book.objects.all(), "is_book_author_unfiltered", author
+        )
+        assert {book.pk for book in filtered} == authored_pks
+    assert isinstance(filtered, QuerySet)
+    assert filtered.count() == len(authored_pks)
+
+    # the filter doubles as a set-based implementation for test_rule_many
+    with django_assert_num_queries(1):
+        assert func_test_rule_many(
+            "is_book_author_filtered", author, books
+        ) == [True, False, True, False]
+
+    # sliced querysets give the permitted rows of the slice, as a queryset that
+    # keeps the ordering
+    for rule_name in ["is_book_author_filtered", "is_book_author_unfiltered"]:
+        filtered = filter_by_rule(
+            Book.objects.order_by("-pk")[:3], rule_name, author
+        )
+        assert isinstance(filtered, QuerySet)
+        assert list(filtered) == [books[2]]
+        assert filtered.filter(pk=books[2].pk).exists()
+    with patch_rules(is_book_author_filtered=True):
+        assert (
+            list(
+                filter_by_rule(
+                    Book.objects.order_by("pk")[:3],
+                    "is_book_author_filtered",
+                    author,
+                )
+            )
+            == books[:3]
+        )
+    with patch_rules(is_book_author_filtered=False):
+        assert not filter_by_rule(
+            Book.objects.all()[:3], "is_book_author_filtered", author
+        ).exists()
+
+    with patch_rules(is_book_author_filtered=False):
+        assert not filter_by_rule(
+            Book.objects.all(), "is_book_author_filtered", author
+        ).exists()
+    with patch_rules(is_book_author_filtered=True):
+        assert filter_by_rule(
+            Book.objects.all(), "is_book_author_filtered", author
+        ).count() == len(books)